@@ -0,0 +1,27 @@
+"""short code sequence
+
+Revision ID: 0ddcad0ccadb
+Revises: 2a10b3614575
+Create Date: 2026-10-18 19:42:02.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0ddcad0ccadb"
+down_revision: Union[str, None] = "2a10b3614575"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence("short_code_block_seq")))
+
+
+def downgrade() -> None:
+    op.execute(sa.schema.DropSequence(sa.Sequence("short_code_block_seq")))
@@ -0,0 +1,46 @@
+"""keyset pagination indexes
+
+Revision ID: 03a6e37c3f11
+Revises: 0ddcad0ccadb
+Create Date: 2026-10-18 20:15:10.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "03a6e37c3f11"
+down_revision: Union[str, None] = "0ddcad0ccadb"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_links_user_id_created_at_id",
+        "links",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+    op.create_index(
+        "ix_links_created_at_id",
+        "links",
+        [sa.text("created_at DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+    op.create_index(
+        "ix_users_created_at_id",
+        "users",
+        [sa.text("created_at DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_created_at_id", table_name="users")
+    op.drop_index("ix_links_created_at_id", table_name="links")
+    op.drop_index("ix_links_user_id_created_at_id", table_name="links")
@@ -0,0 +1,45 @@
+"""link click rollups
+
+Revision ID: c7e0aa735a2d
+Revises: 03a6e37c3f11
+Create Date: 2026-10-18 20:30:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c7e0aa735a2d"
+down_revision: Union[str, None] = "03a6e37c3f11"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "link_click_rollups",
+        sa.Column("link_id", sa.UUID(), nullable=False),
+        sa.Column("granularity", sa.String(length=6), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("clicks", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["link_id"], ["links.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("link_id", "granularity", "bucket_start"),
+    )
+    op.create_index(
+        "ix_link_click_rollups_granularity_bucket_start",
+        "link_click_rollups",
+        ["granularity", "bucket_start"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_link_click_rollups_granularity_bucket_start",
+        table_name="link_click_rollups",
+    )
+    op.drop_table("link_click_rollups")
@@ -0,0 +1,49 @@
+"""link counters
+
+Revision ID: 5b8e1d2f4a90
+Revises: c7e0aa735a2d
+Create Date: 2026-10-18 22:30:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5b8e1d2f4a90"
+down_revision: Union[str, None] = "c7e0aa735a2d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "link_counters",
+        sa.Column("link_id", sa.UUID(), nullable=False),
+        sa.Column("clicks", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["link_id"], ["links.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("link_id"),
+    )
+    # Leave room on each page so click updates are HOT (heap-only tuples)
+    op.execute("ALTER TABLE link_counters SET (fillfactor = 50)")
+    op.execute(
+        """
+        INSERT INTO link_counters (link_id, clicks)
+        SELECT id, clicks FROM links WHERE clicks > 0
+        """
+    )
+    op.drop_column("links", "clicks")
+
+
+def downgrade() -> None:
+    op.add_column("links", sa.Column("clicks", sa.Integer(), nullable=True))
+    op.execute(
+        """
+        UPDATE links SET clicks = link_counters.clicks
+        FROM link_counters WHERE link_counters.link_id = links.id
+        """
+    )
+    op.drop_table("link_counters")
@@ -0,0 +1,37 @@
+"""link expiry
+
+Revision ID: 8d3c6a91e2b7
+Revises: 5b8e1d2f4a90
+Create Date: 2026-10-18 23:00:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8d3c6a91e2b7"
+down_revision: Union[str, None] = "5b8e1d2f4a90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "links", sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_index(
+        "ix_links_expires_at",
+        "links",
+        ["expires_at"],
+        unique=False,
+        postgresql_where=sa.text("expires_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_links_expires_at", table_name="links")
+    op.drop_column("links", "expires_at")
@@ -0,0 +1,43 @@
+"""click events
+
+Revision ID: e4f7a2c95b16
+Revises: 8d3c6a91e2b7
+Create Date: 2026-10-18 23:30:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e4f7a2c95b16"
+down_revision: Union[str, None] = "8d3c6a91e2b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "click_events",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("short_code", sa.String(), nullable=False),
+        sa.Column("clicked_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("referrer", sa.Text(), nullable=True),
+        sa.Column("user_agent", sa.Text(), nullable=True),
+        sa.Column("country", sa.String(length=2), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_click_events_short_code_clicked_at",
+        "click_events",
+        ["short_code", "clicked_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_click_events_short_code_clicked_at", table_name="click_events")
+    op.drop_table("click_events")
@@ -0,0 +1,47 @@
+"""link url hash
+
+Revision ID: f2b9d04c7e18
+Revises: e4f7a2c95b16
+Create Date: 2026-10-18 23:59:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f2b9d04c7e18"
+down_revision: Union[str, None] = "e4f7a2c95b16"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("links", sa.Column("url_hash", sa.LargeBinary(), nullable=True))
+    # Each user's oldest non-expiring link to a URL becomes the one dedupe returns
+    op.execute(
+        """
+        UPDATE links SET url_hash = sha256(convert_to(original_url, 'UTF8'))
+        WHERE id IN (
+            SELECT DISTINCT ON (user_id, original_url) id
+            FROM links
+            WHERE user_id IS NOT NULL AND expires_at IS NULL
+            ORDER BY user_id, original_url, created_at, id
+        )
+        """
+    )
+    op.create_index(
+        "ix_links_user_id_url_hash",
+        "links",
+        ["user_id", "url_hash"],
+        unique=True,
+        postgresql_where=sa.text("url_hash IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_links_user_id_url_hash", table_name="links")
+    op.drop_column("links", "url_hash")
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTask:
+    """
+    Run a coroutine function repeatedly in the background.
+    Sleeps `interval` seconds between runs; failures are logged
+    and retried on the next run instead of killing the loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[object]],
+        interval: float,
+    ):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start the background loop (no-op if already running)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        """Cancel the background loop and wait for it to finish."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.func()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Background task %r failed", self.name)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,90 @@
+"""
+Compare two benchmark result files written by benchmarks/load.py.
+
+    python benchmarks/compare.py results/before.json results/after.json
+
+Prints each scenario's RPS, latency percentiles and queries per request
+side by side, with the relative change. Exits with status 1 when any
+scenario's RPS dropped or p99 grew by more than --threshold percent, or
+when either run of a scenario had errors or unexpected statuses.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# (label, getter, higher is better)
+COLUMNS = (
+    ("rps", lambda result: result["rps"], True),
+    ("p50 ms", lambda result: result["latency_ms"]["p50"], False),
+    ("p95 ms", lambda result: result["latency_ms"]["p95"], False),
+    ("p99 ms", lambda result: result["latency_ms"]["p99"], False),
+    ("queries/req", lambda result: result.get("db_queries_per_request"), False),
+)
+# Columns checked against --threshold
+GATED = ("rps", "p99 ms")
+
+
+def change(before: float | None, after: float | None) -> float | None:
+    if before is None or after is None or before == 0:
+        return None
+    return (after - before) / before * 100
+
+
+def failures(result: dict) -> int:
+    """Requests that failed or got an unexpected status, so are not measured."""
+    return result["errors"] + result.get("unexpected", 0)
+
+
+def compare(before: dict, after: dict, threshold: float) -> bool:
+    """Print the comparison; return True if no gated metric regressed."""
+    print(f"before: {before.get('commit')}  after: {after.get('commit')}")
+    ok = True
+    for scenario in after["scenarios"]:
+        if scenario not in before["scenarios"]:
+            continue
+        print(f"\n{scenario}")
+        for run, results in (("before", before), ("after", after)):
+            failed = failures(results["scenarios"][scenario])
+            if failed:
+                ok = False
+                print(f"  INVALID: {failed} failed requests in the {run} run")
+        for label, get, higher_is_better in COLUMNS:
+            old = get(before["scenarios"][scenario])
+            new = get(after["scenarios"][scenario])
+            delta = change(old, new)
+            regressed = (
+                delta is not None
+                and (-delta if higher_is_better else delta) > threshold
+            )
+            if regressed and label in GATED:
+                ok = False
+            print(
+                f"  {label:12} {old!s:>10} -> {new!s:>10}"
+                + (f"  {delta:+6.1f}%" if delta is not None else "")
+                + ("  REGRESSION" if regressed else "")
+            )
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10,
+        help="Percent change counted as a regression",
+    )
+    args = parser.parse_args()
+
+    before = json.loads(args.before.read_text())
+    after = json.loads(args.after.read_text())
+    if not compare(before, after, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+"""
+Load test the redirect, auth and link creation paths.
+
+Starts uvicorn against the Postgres and Redis configured in the
+environment, with rate limiting off and a password hashing queue that
+admits every concurrent login (or targets a running server with --url,
+which must be configured the same way), creates a
+benchmark user and links, then runs each scenario and reports RPS,
+latency percentiles and database queries per request. RPS and latency
+count only responses with the scenario's expected status; if any other
+status or a connection error occurs, the run is marked invalid and exits
+with status 1. Results are saved as JSON; compare two runs with
+benchmarks/compare.py.
+
+    python benchmarks/load.py --requests 20000 --concurrency 64
+    python benchmarks/load.py --url http://localhost:3062 --scenarios redirect,login
+
+Scenarios:
+    redirect       GET /r/{code} over warm links, Zipf-distributed
+    redirect_json  GET /redirect/{code}, same distribution
+    cache_miss     GET /r/{code}, every link requested once (database lookups)
+    unknown        GET /r/{code} for codes that do not exist
+    login          POST /auth/login
+    create         POST /links/create
+"""
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlsplit
+
+BACKEND_DIR = Path(__file__).parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Add backend directory to path
+sys.path.insert(0, str(BACKEND_DIR))
+
+SCENARIOS = ("redirect", "redirect_json", "cache_miss", "unknown", "login", "create")
+# The status each scenario's requests should get; anything else (429, 503,
+# ...) is a failure, not throughput
+EXPECTED_STATUS = {
+    "redirect": 302,
+    "redirect_json": 200,
+    "cache_miss": 302,
+    "unknown": 404,
+    "login": 200,
+    "create": 200,
+}
+BENCH_PASSWORD = "benchmark-password"
+
+
+class HttpConnection:
+    """
+    Minimal keep-alive HTTP/1.1 client, so the benchmark needs no extra
+    dependencies and adds as little client overhead as possible.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        headers: dict[str, str] | None = None,
+        body: bytes = b"",
+    ) -> tuple[int, bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        lines.append(f"Content-Length: {len(body)}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        close = False
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                close = True
+        content = await self.reader.readexactly(length)
+
+        if close:
+            await self.close()
+        return status, content
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+@dataclass
+class Target:
+    host: str
+    port: int
+    token: str = ""
+    hot_codes: list[str] = field(default_factory=list)
+    cold_codes: list[str] = field(default_factory=list)
+
+    def connect(self) -> HttpConnection:
+        return HttpConnection(self.host, self.port)
+
+    def auth_headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+def zipf_sampler(items: list, exponent: float, rng: random.Random):
+    """Sample items with Zipf popularity: the nth item has weight 1/n^exponent."""
+    cumulative = list(
+        itertools.accumulate(1 / rank**exponent for rank in range(1, len(items) + 1))
+    )
+    total = cumulative[-1]
+    return lambda: items[bisect.bisect(cumulative, rng.random() * total)]
+
+
+def build_requests(scenario: str, target: Target, count: int, args) -> list[tuple]:
+    """Build the (method, path, headers, body) requests of a scenario upfront."""
+    rng = random.Random(args.seed)
+
+    if scenario in ("redirect", "redirect_json"):
+        prefix = "/r/" if scenario == "redirect" else "/redirect/"
+        sample = zipf_sampler(target.hot_codes, args.zipf, rng)
+        return [("GET", prefix + sample(), None, b"") for _ in range(count)]
+
+    if scenario == "cache_miss":
+        return [("GET", f"/r/{code}", None, b"") for code in target.cold_codes]
+
+    if scenario == "unknown":
+        from short_codes import SHORT_CODE_ALPHABET, SHORT_CODE_LENGTH
+
+        return [
+            (
+                "GET",
+                "/r/" + "".join(rng.choices(SHORT_CODE_ALPHABET, k=SHORT_CODE_LENGTH)),
+                None,
+                b"",
+            )
+            for _ in range(count)
+        ]
+
+    if scenario == "login":
+        body = json.dumps({"username": args.user, "password": BENCH_PASSWORD})
+        headers = {"Content-Type": "application/json"}
+        return [("POST", "/auth/login", headers, body.encode())] * count
+
+    if scenario == "create":
+        headers = {"Content-Type": "application/json", **target.auth_headers()}
+        return [
+            (
+                "POST",
+                "/links/create",
+                headers,
+                json.dumps({"url": f"https://example.com/bench/{i}"}).encode(),
+            )
+            for i in range(count)
+        ]
+
+    raise ValueError(f"Unknown scenario {scenario!r}")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * pct / 100), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def run_requests(target: Target, requests: list[tuple], concurrency: int):
+    """
+    Send requests over `concurrency` keep-alive connections.
+    Returns latencies by status, connection errors and elapsed seconds.
+    """
+    latencies: dict[int, list[float]] = {}
+    errors = 0
+    pending = iter(requests)
+
+    async def client() -> None:
+        nonlocal errors
+        connection = target.connect()
+        try:
+            for method, path, headers, body in pending:
+                started = time.perf_counter()
+                try:
+                    status, _ = await connection.request(method, path, headers, body)
+                except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                    errors += 1
+                    await connection.close()
+                    continue
+                latencies.setdefault(status, []).append(time.perf_counter() - started)
+        finally:
+            await connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+METRIC_LINE = re.compile(r"^(\w+)(?:\{([^}]*)\})? (\S+)$")
+
+
+async def scrape_metrics(target: Target, token: str | None) -> dict[str, float]:
+    """Sum /metrics samples by name and labels (empty if unavailable)."""
+    headers = {"Authorization": f"Bearer {token}"} if token else None
+    connection = target.connect()
+    try:
+        status, body = await connection.request("GET", "/metrics", headers)
+    except OSError:
+        return {}
+    finally:
+        await connection.close()
+    if status != 200:
+        return {}
+
+    samples: dict[str, float] = {}
+    for line in body.decode().splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            labels = ",".join(
+                part
+                for part in (labels or "").split(",")
+                if not part.startswith("worker=")
+            )
+            key = f"{name}{{{labels}}}" if labels else name
+            samples[key] = samples.get(key, 0) + float(value)
+    return samples
+
+
+def metric_delta(before: dict, after: dict, prefix: str) -> dict[str, float]:
+    return {
+        key: after[key] - before.get(key, 0)
+        for key in after
+        if key.startswith(prefix) and after[key] != before.get(key, 0)
+    }
+
+
+async def run_scenario(scenario: str, target: Target, args) -> dict:
+    requests = build_requests(scenario, target, args.requests, args)
+    if args.warmup and scenario in ("redirect", "redirect_json"):
+        await run_requests(target, requests[: args.warmup], args.concurrency)
+
+    before = await scrape_metrics(target, args.metrics_token)
+    latencies_by_status, errors, elapsed = await run_requests(
+        target, requests, args.concurrency
+    )
+    # Let every worker publish its metrics before reading them
+    await asyncio.sleep(args.metrics_delay)
+    after = await scrape_metrics(target, args.metrics_token)
+
+    expected = EXPECTED_STATUS[scenario]
+    latencies = sorted(latencies_by_status.get(expected, []))
+    result = {
+        "requests": len(requests),
+        "errors": errors,
+        "statuses": {
+            str(status): len(values)
+            for status, values in sorted(latencies_by_status.items())
+        },
+        # Responses with another status than expected
+        "unexpected": len(requests) - errors - len(latencies),
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            f"p{pct}": round(percentile(latencies, pct) * 1000, 3)
+            for pct in (50, 95, 99)
+        },
+    }
+    if after:
+        queries = after.get("db_query_seconds_count", 0) - before.get(
+            "db_query_seconds_count", 0
+        )
+        result["db_queries_per_request"] = round(queries / len(requests), 3)
+        result["link_lookups"] = metric_delta(before, after, "link_lookups_total")
+    return result
+
+
+async def prepare(target: Target, args) -> None:
+    """Create the benchmark user and its links, and log in."""
+    from management.commands.createsuperuser import create_superuser
+
+    await create_superuser(args.user, BENCH_PASSWORD)
+
+    connection = target.connect()
+    try:
+        status, body = await connection.request(
+            "POST",
+            "/auth/login",
+            {"Content-Type": "application/json"},
+            json.dumps({"username": args.user, "password": BENCH_PASSWORD}).encode(),
+        )
+        if status != 200:
+            raise SystemExit(f"Login failed with {status}: {body.decode()}")
+        target.token = json.loads(body)["access_token"]
+
+        async def create_links(count: int, prefix: str) -> list[str]:
+            codes = []
+            for start in range(0, count, 10000):
+                urls = [
+                    f"https://example.com/{prefix}/{i}"
+                    for i in range(start, min(start + 10000, count))
+                ]
+                status, body = await connection.request(
+                    "POST",
+                    "/links/bulk",
+                    {"Content-Type": "application/json", **target.auth_headers()},
+                    json.dumps(urls).encode(),
+                )
+                if status != 200:
+                    raise SystemExit(f"Link creation failed with {status}")
+                codes += [item["short_code"] for item in json.loads(body)["results"]]
+            return codes
+
+        target.hot_codes = await create_links(args.links, "hot")
+        if "cache_miss" in args.scenarios:
+            target.cold_codes = await create_links(args.requests, "cold")
+    finally:
+        await connection.close()
+
+
+async def wait_for_server(target: Target, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        connection = target.connect()
+        try:
+            status, _ = await connection.request("GET", "/health")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            await connection.close()
+        if time.monotonic() > deadline:
+            raise SystemExit("Server did not become healthy")
+        await asyncio.sleep(0.2)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args) -> dict:
+    url = urlsplit(args.url or f"http://127.0.0.1:{args.port}")
+    target = Target(url.hostname, url.port or 80)
+
+    server = None
+    if not args.url:
+        from settings import PASSWORD_HASH_QUEUE
+
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "main:app",
+                "--port",
+                str(args.port),
+                "--workers",
+                str(args.workers),
+                "--no-access-log",
+            ],
+            cwd=BACKEND_DIR,
+            env={
+                **os.environ,
+                # One client sending every request would be throttled
+                "RATE_LIMIT_ENABLED": "false",
+                # Admit every concurrent login rather than shedding some with 503
+                "PASSWORD_HASH_QUEUE": str(max(PASSWORD_HASH_QUEUE, args.concurrency)),
+            },
+        )
+
+    try:
+        await wait_for_server(target)
+        await prepare(target, args)
+
+        results = {}
+        for scenario in args.scenarios:
+            result = await run_scenario(scenario, target, args)
+            results[scenario] = result
+            print(
+                f"{scenario:14} {result['rps']:10.1f} rps  "
+                f"p50 {result['latency_ms']['p50']:8.2f}ms  "
+                f"p95 {result['latency_ms']['p95']:8.2f}ms  "
+                f"p99 {result['latency_ms']['p99']:8.2f}ms  "
+                f"queries/req {result.get('db_queries_per_request', '-')}  "
+                f"errors {result['errors']}"
+                + (f"  UNEXPECTED {result['statuses']}" if result["unexpected"] else "")
+            )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    return {
+        "commit": git_commit(),
+        # False if any scenario saw errors or unexpected statuses
+        "valid": all(
+            not result["errors"] and not result["unexpected"]
+            for result in results.values()
+        ),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "options": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "links": args.links,
+            "zipf": args.zipf,
+            "seed": args.seed,
+            "workers": args.workers if not args.url else None,
+        },
+        "scenarios": results,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0].strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("Scenarios:")[1],
+    )
+    parser.add_argument(
+        "--url",
+        help="Benchmark a running server instead; it must run with "
+        "RATE_LIMIT_ENABLED=false, or requests are throttled, and a "
+        "PASSWORD_HASH_QUEUE of at least --concurrency, or logins are shed",
+    )
+    parser.add_argument("--port", type=int, default=3099, help="Port to start on")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        type=lambda value: value.split(","),
+        help="Comma-separated scenarios to run (default: all)",
+    )
+    parser.add_argument("--requests", type=int, default=10000, help="Per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--links", type=int, default=10000, help="Warm links")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent")
+    parser.add_argument("--warmup", type=int, default=2000, help="Warm-up requests")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--user",
+        default=f"bench-{uuid.uuid4().hex[:8]}@example.com",
+        help="Benchmark user, created as an admin",
+    )
+    parser.add_argument(
+        "--metrics-token",
+        default=os.environ.get("METRICS_TOKEN"),
+        help="Token for /metrics (default: METRICS_TOKEN)",
+    )
+    parser.add_argument(
+        "--metrics-delay",
+        type=float,
+        default=None,
+        help="Seconds to wait for workers to publish metrics "
+        "(default: METRICS_PUBLISH_INTERVAL + 1 with several workers)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Where to save JSON results (default: benchmarks/results/)",
+    )
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.metrics_delay is None:
+        from settings import METRICS_PUBLISH_INTERVAL
+
+        single_worker = args.workers == 1 and not args.url
+        args.metrics_delay = 0 if single_worker else METRICS_PUBLISH_INTERVAL + 1
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(main(args))
+
+    output = args.output or RESULTS_DIR / (
+        f"{datetime.now():%Y%m%d_%H%M%S}_{results['commit'] or 'unknown'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"Saved results to {output}")
+    if not results["valid"]:
+        sys.exit("Invalid run: some requests failed or got an unexpected status")
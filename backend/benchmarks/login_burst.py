@@ -0,0 +1,102 @@
+"""
+Measure how a burst of logins affects other requests on the same worker.
+
+Runs N concurrent password verifications, once inline on the event loop
+(the old behaviour) and once through the hashing pool, while a ticker
+stands in for redirect traffic. Reports the ticker's latency percentiles.
+
+    python benchmarks/login_burst.py --logins 50 --rounds 12
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Settings are read at import time; the benchmark needs no real services
+for name, value in {
+    "POSTGRES_USER": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_DB": "bench",
+    "REDIS_URL": "redis://localhost:6379",
+    "JWT_SECRET_KEY": "bench",
+    "SHORT_CODE_SECRET": "bench",
+}.items():
+    os.environ.setdefault(name, value)
+
+from fastapi import HTTPException  # noqa: E402
+
+from routes.auth import service  # noqa: E402
+
+TICK_INTERVAL = 0.005  # seconds between simulated redirects
+
+
+async def _ticker(stop: asyncio.Event, latencies: list[float]) -> None:
+    """Record how late each simulated redirect gets scheduled."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_INTERVAL)
+        latencies.append(time.perf_counter() - started - TICK_INTERVAL)
+
+
+async def _run(verify, logins: int, hashed: str) -> tuple[list[float], int, float]:
+    stop = asyncio.Event()
+    latencies: list[float] = []
+    ticker = asyncio.create_task(_ticker(stop, latencies))
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(verify("password", hashed) for _ in range(logins)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+    rejected = sum(isinstance(result, HTTPException) for result in results)
+    return latencies, rejected, elapsed
+
+
+async def _verify_inline(plain: str, hashed: str) -> tuple[bool, str | None]:
+    return service.pwd_context.verify_and_update(plain, hashed)
+
+
+def _report(label: str, latencies: list[float], rejected: int, elapsed: float):
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else []
+    p50 = quantiles[49] if quantiles else latencies[0]
+    p99 = quantiles[98] if quantiles else latencies[0]
+    print(
+        f"{label:8} burst {elapsed:6.2f}s  rejected {rejected:4}  "
+        f"redirect lag p50 {p50 * 1000:8.2f}ms  p99 {p99 * 1000:8.2f}ms"
+    )
+
+
+async def main(logins: int, rounds: int) -> None:
+    service.pwd_context.update(bcrypt__rounds=rounds)
+    hashed = service.pwd_context.hash("password")
+    print(
+        f"{logins} concurrent logins, bcrypt rounds {rounds}, "
+        f"{service.PASSWORD_HASH_WORKERS} {service.PASSWORD_HASH_EXECUTOR} workers"
+    )
+    _report("inline", *await _run(_verify_inline, logins, hashed))
+    _report("pool", *await _run(service.verify_password, logins, hashed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--logins", type=int, default=20, help="Concurrent logins")
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=service.BCRYPT_ROUNDS,
+        help="bcrypt cost (defaults to BCRYPT_ROUNDS)",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args.logins, args.rounds))
@@ -0,0 +1,86 @@
+"""
+Time the in-process work on the redirect and auth hot paths.
+
+Needs no Postgres or Redis, so it runs anywhere and isolates CPU cost
+from I/O. Pair it with benchmarks/load.py for end-to-end numbers.
+
+    python benchmarks/micro.py --output micro.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Settings are read at import time; nothing here connects to them
+for name, value in {
+    "POSTGRES_USER": "bench",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_DB": "bench",
+    "REDIS_URL": "redis://localhost:6379",
+    "JWT_SECRET_KEY": "bench",
+    "SHORT_CODE_SECRET": "bench",
+}.items():
+    os.environ.setdefault(name, value)
+
+from cache import LocalCache  # noqa: E402
+from metrics import Histogram  # noqa: E402
+from routes.auth.service import (  # noqa: E402
+    create_access_token,
+    decode_token,
+    token_cache,
+)
+from routes.redirect.bloom import bloom_offsets  # noqa: E402
+from routes.redirect.service import CachedLink  # noqa: E402
+from short_codes import is_valid_short_code, short_code_for_index  # noqa: E402
+
+
+def _cases() -> dict:
+    code = short_code_for_index(12345)
+    cached = CachedLink("https://example.com/some/long/path?q=1", None).dumps()
+    cache = LocalCache(10000, 60)
+    cache.set(f"link:{code}", cached)
+    token = create_access_token({"sub": "00000000-0000-0000-0000-000000000001"})
+    histogram = Histogram("micro_benchmark_seconds", "Benchmark histogram").labels()
+
+    def decode_uncached():
+        token_cache.clear()
+        decode_token(token)
+
+    return {
+        "is_valid_short_code": lambda: is_valid_short_code(code),
+        "short_code_for_index": lambda: short_code_for_index(12345),
+        "bloom_offsets": lambda: bloom_offsets(code),
+        "cached_link_loads": lambda: CachedLink.loads(cached),
+        "local_cache_get": lambda: cache.get(f"link:{code}"),
+        "decode_token_cached": lambda: decode_token(token),
+        "decode_token_uncached": decode_uncached,
+        "histogram_observe": lambda: histogram.observe(0.003),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N runs")
+    parser.add_argument("--output", type=Path, help="Save results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for name, func in _cases().items():
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=args.repeat, number=number)) / number
+        results[name] = round(best * 1e9, 1)
+        print(f"{name:24} {results[name]:12.1f} ns/op")
+
+    if args.output:
+        args.output.write_text(json.dumps({"ns_per_op": results}, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
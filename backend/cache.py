@@ -0,0 +1,212 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from redis.asyncio import Redis
+
+from background import BackgroundTask
+from metrics import Counter, Gauge, register_collector
+from redis_client import redis_pool
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub channel carrying Redis keys whose cached values are stale
+INVALIDATION_CHANNEL = "cache:invalidate"
+# Value left in Redis by invalidate_many(tombstone_ttl=...)
+TOMBSTONE = "deleted"
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with a per-entry TTL.
+
+    Every key has an invalidation generation that grows when the key is
+    deleted. Read it before loading a value and pass it to set(), so a load
+    that raced with an invalidation does not cache the stale value. When
+    the keys are not known before loading, pass `clock` read beforehand.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        # Generation of the latest delete of recently deleted keys; keys
+        # dropped from here fall back to the newest generation dropped
+        self._clock = 0
+        self._deleted: OrderedDict[str, int] = OrderedDict()
+        self._deleted_floor = 0
+
+    def get(self, key: str) -> Any | None:
+        """Get a cached value, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def generation(self, key: str) -> int:
+        """The key's invalidation generation, to pass to set()."""
+        return self._deleted.get(key, self._deleted_floor)
+
+    @property
+    def clock(self) -> int:
+        """A generation no older than any key's, to pass to set() for any key."""
+        return self._clock
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: float | None = None,
+        generation: int | None = None,
+    ) -> None:
+        """
+        Cache a value, evicting the least recently used entry if full.
+        With a generation, does nothing if the key was deleted since.
+        """
+        if self.max_size <= 0:
+            return
+        if generation is not None and self.generation(key) > generation:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """Remove a key from the cache."""
+        self._entries.pop(key, None)
+        self._clock += 1
+        self._deleted[key] = self._clock
+        self._deleted.move_to_end(key)
+        while len(self._deleted) > max(self.max_size, 1):
+            _, generation = self._deleted.popitem(last=False)
+            self._deleted_floor = generation
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+        self._clock += 1
+        self._deleted.clear()
+        self._deleted_floor = self._clock
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Local caches by key prefix ("link" caches "link:{short_code}" keys)
+_local_caches: dict[str, LocalCache] = {}
+
+
+def register_local_cache(prefix: str, cache: LocalCache) -> None:
+    """Register a local cache to be invalidated through pub/sub."""
+    _local_caches[prefix] = cache
+
+
+_cache_hits = Counter("local_cache_hits_total", "Local cache hits", ("cache",))
+_cache_misses = Counter("local_cache_misses_total", "Local cache misses", ("cache",))
+_cache_entries = Gauge("local_cache_entries", "Local cache size", ("cache",))
+
+
+def _collect_cache_metrics() -> None:
+    for prefix, cache in _local_caches.items():
+        _cache_hits.labels(prefix).value = cache.hits
+        _cache_misses.labels(prefix).value = cache.misses
+        _cache_entries.labels(prefix).set(len(cache))
+
+
+register_collector(_collect_cache_metrics)
+
+
+def _evict_local(key: str) -> None:
+    prefix = key.split(":", 1)[0]
+    cache = _local_caches.get(prefix)
+    if cache is not None:
+        cache.delete(key)
+
+
+async def invalidate(redis: Redis, key: str) -> None:
+    """
+    Invalidate a cached key everywhere: delete it from Redis and
+    tell every worker to drop its local copy.
+    """
+    await invalidate_many(redis, [key])
+
+
+async def invalidate_many(
+    redis: Redis, keys: list[str], tombstone_ttl: int | None = None
+) -> None:
+    """
+    Invalidate several cached keys everywhere in one round trip.
+
+    With tombstone_ttl, the keys are set to TOMBSTONE for that many seconds
+    instead of deleted, so fills that loaded the old value before the
+    invalidation and write it with SET NX cannot put it back.
+    """
+    if not keys:
+        return
+    for key in keys:
+        _evict_local(key)
+    async with redis.pipeline(transaction=False) as pipe:
+        if tombstone_ttl is None:
+            pipe.delete(*keys)
+        else:
+            for key in keys:
+                pipe.set(key, TOMBSTONE, ex=tombstone_ttl)
+        for key in keys:
+            pipe.publish(INVALIDATION_CHANNEL, key)
+        await pipe.execute()
+
+
+# Run when the listener reconnects after losing its Redis connection
+_reconnect_hooks: list[Callable[[], Awaitable[object]]] = []
+_has_subscribed = False
+
+
+def register_reconnect_hook(hook: Callable[[], Awaitable[object]]) -> None:
+    """Register a coroutine function to run after a Redis reconnect."""
+    _reconnect_hooks.append(hook)
+
+
+async def listen_for_invalidations() -> None:
+    """Evict local cache entries as invalidations arrive from other workers."""
+    global _has_subscribed
+    async with Redis(connection_pool=redis_pool) as redis:
+        async with redis.pubsub() as pubsub:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+
+            # On reconnect, invalidations may have been missed while
+            # disconnected, and Redis itself may have restarted empty.
+            # Invalidations arriving meanwhile are buffered and applied after.
+            if _has_subscribed:
+                for cache in _local_caches.values():
+                    cache.clear()
+                for hook in _reconnect_hooks:
+                    try:
+                        await hook()
+                    except Exception:
+                        logger.exception("Reconnect hook %r failed", hook)
+            _has_subscribed = True
+
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    _evict_local(message["data"])
+
+
+# Restarts the subscription a second after the connection drops
+invalidation_listener = BackgroundTask(
+    "cache-invalidation", listen_for_invalidations, 1
+)
@@ -1,26 +1,219 @@
+import asyncio
+import logging
+import time
 from typing import AsyncGenerator
 
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from settings import DATABASE_URL
+from background import BackgroundTask
+from metrics import Counter, Gauge, Histogram, register_collector
+from settings import (
+    DATABASE_READ_URL,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_REPLICA_CHECK_INTERVAL,
+    DB_REPLICA_MAX_LAG,
+    DB_STATEMENT_CACHE_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Request header that sends a request's reads to the primary, for
+# clients that must see their own writes
+READ_PRIMARY_HEADER = "X-Read-Primary"
+
+pool_wait_seconds = Histogram(
+    "db_pool_wait_seconds", "Time waited to check out a database connection"
+).labels()
+pool_timeouts = Counter(
+    "db_pool_timeouts_total", "Connection checkouts that timed out"
+).labels()
+_pool_checked_out = Gauge("db_pool_checked_out", "Database connections in use").labels()
+_pool_overflow = Gauge(
+    "db_pool_overflow", "Database connections open beyond the pool size"
+).labels()
+query_seconds = Histogram("db_query_seconds", "SQL statement execution time").labels()
+_replica_healthy_gauge = Gauge(
+    "db_replica_healthy", "Whether reads go to the read replica"
+).labels()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records checkout waits in pool_wait_seconds, including
+    the time to open a new connection when the pool grows.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_timeouts.inc()
+            raise
+        finally:
+            pool_wait_seconds.observe(time.perf_counter() - started)
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    new_engine = create_async_engine(
+        url,
+        echo=False,
+        poolclass=InstrumentedPool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+    )
+    # Time every SQL statement
+    event.listen(new_engine.sync_engine, "before_cursor_execute", _start_query_timer)
+    event.listen(new_engine.sync_engine, "after_cursor_execute", _stop_query_timer)
+    return new_engine
 
-engine: AsyncEngine = create_async_engine(DATABASE_URL, echo=False)
+
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    query_seconds.observe(time.perf_counter() - context._query_started)
+
+
+# Primary, for writes and reads that must see them
+engine: AsyncEngine = _create_engine(DATABASE_URL)
 AsyncSessionLocal = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+# Read replica, if configured
+read_engine: AsyncEngine | None = (
+    _create_engine(DATABASE_READ_URL) if DATABASE_READ_URL else None
+)
+ReadSessionLocal = (
+    async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+    if read_engine is not None
+    else AsyncSessionLocal
+)
+_replica_healthy = read_engine is not None
+_replica_healthy_gauge.set(int(_replica_healthy))
+
+# Replication delay, or 0 while the replica has replayed all it received
+# (the last replay time alone grows whenever the primary is idle)
+REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+async def check_replica() -> None:
+    """Send reads back to the primary while the replica is down or lagging."""
+    global _replica_healthy
+    try:
+        async with asyncio.timeout(DB_REPLICA_CHECK_INTERVAL):
+            async with read_engine.connect() as conn:
+                lag = (await conn.execute(REPLICA_LAG_SQL)).scalar() or 0
+        healthy = lag <= DB_REPLICA_MAX_LAG
+        if not healthy:
+            logger.warning("Read replica is %.1fs behind", lag)
+    except (OSError, TimeoutError, SQLAlchemyError) as exc:
+        logger.warning("Read replica is unreachable: %r", exc)
+        healthy = False
+
+    if healthy != _replica_healthy:
+        logger.warning(
+            "Routing reads to the %s", "read replica" if healthy else "primary"
+        )
+    _replica_healthy = healthy
+    _replica_healthy_gauge.set(int(healthy))
+
+
+replica_checker = BackgroundTask(
+    "replica-health", check_replica, DB_REPLICA_CHECK_INTERVAL
+)
+
+
+def read_sessionmaker(primary: bool = False) -> async_sessionmaker:
+    """
+    Session factory for read-only queries: the replica when configured
+    and healthy, otherwise (or when primary is set) the primary.
+    Reads that may miss a just-committed write should retry on the primary.
+    """
+    if primary or not _replica_healthy:
+        return AsyncSessionLocal
+    return ReadSessionLocal
+
+
+def _collect_pool_metrics() -> None:
+    _pool_checked_out.set(engine.pool.checkedout())
+    _pool_overflow.set(max(engine.pool.overflow(), 0))
+
+
+register_collector(_collect_pool_metrics)
+
+
+def get_pool_stats() -> dict:
+    """Connection pool usage for this worker."""
+    pool = engine.pool
+    cumulative = 0
+    buckets = {}
+    for bound, count in zip(
+        [*pool_wait_seconds.buckets, "+Inf"], pool_wait_seconds.counts
+    ):
+        cumulative += count
+        buckets[str(bound)] = cumulative
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "wait_seconds": {
+            "count": cumulative,
+            "sum": pool_wait_seconds.sum,
+            "timeouts": pool_timeouts.value,
+            "buckets": buckets,
+        },
+    }
+
 
 async def close_db() -> None:
-    """Close database engine."""
+    """Close database engines."""
     await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
 
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """Dependency to get database session."""
+async def get_write_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency to get a session on the primary, for writes."""
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency to get a session for read-only queries, on the replica
+    unless it is unhealthy or the request sends READ_PRIMARY_HEADER.
+    """
+    primary = request.headers.get(READ_PRIMARY_HEADER, "").lower() == "true"
+    async with read_sessionmaker(primary)() as session:
+        yield session
@@ -1,13 +1,82 @@
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from cache import invalidation_listener
+from database import close_db, read_engine, replica_checker
+from routes.analytics.service import click_compactor
+from routes.metrics.middleware import MetricsMiddleware
+from routes.metrics.service import loop_lag_monitor, metrics_publisher
+from routes.pagination import NEXT_CURSOR_HEADER
+from routes.ratelimit.middleware import RateLimitMiddleware
+from routes.redirect.bloom import bloom_builder
+from routes.redirect.clicks import click_flusher, flush_pending_clicks
+from routes.redirect.fast import FastRedirectMiddleware
+from routes.redirect.reaper import link_reaper
+from routes.redirect.warmup import start_cache_warming
 from routes.routes import include_routers
-from settings import APP_DESCRIPTION, APP_TITLE, APP_VERSION, CORS_ORIGINS
+from settings import (
+    APP_DESCRIPTION,
+    APP_TITLE,
+    APP_VERSION,
+    CLIENT_IP_HEADER,
+    CORS_ORIGINS,
+    RATE_LIMIT_ENABLED,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Start background workers on startup and drain them on shutdown."""
+    if RATE_LIMIT_ENABLED and not CLIENT_IP_HEADER:
+        logger.warning(
+            "Rate limiting is enabled but CLIENT_IP_HEADER is not set, so only "
+            "signed-in users are rate limited; anonymous redirects, logins and "
+            "registrations are not. Set CLIENT_IP_HEADER (CF-Connecting-IP "
+            "behind Cloudflare Tunnel) to limit them by client IP."
+        )
+    if read_engine is not None:
+        replica_checker.start()
+    cache_warming = await start_cache_warming()
+    click_flusher.start()
+    invalidation_listener.start()
+    bloom_builder.start()
+    click_compactor.start()
+    link_reaper.start()
+    metrics_publisher.start()
+    loop_lag_monitor.start()
+    yield
+    if cache_warming is not None:
+        cache_warming.cancel()
+    await loop_lag_monitor.stop()
+    await metrics_publisher.stop()
+    await link_reaper.stop()
+    await click_compactor.stop()
+    await bloom_builder.stop()
+    await invalidation_listener.stop()
+    await click_flusher.stop()
+    await replica_checker.stop()
+
+    # Final flush so buffered clicks reach the database before exit.
+    # If it fails, the clicks stay in Redis for the next flush.
+    try:
+        await flush_pending_clicks()
+    except Exception:
+        logger.exception("Final click flush failed")
+
+    await close_db()
+
 
 app = FastAPI(
     title=APP_TITLE,
     description=APP_DESCRIPTION,
     version=APP_VERSION,
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -17,8 +86,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Serve GET /r/{short_code} redirects ahead of routing and CORS; middleware
+# added below wraps it, so rate limits and metrics still apply
+app.add_middleware(FastRedirectMiddleware)
+
+# Throttle clients that exceed their limits, ahead of fast-path redirects too
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
+# Time every request, including fast-path redirects
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 include_routers(app)
 
@@ -6,11 +6,14 @@ from pathlib import Path
 # Add backend directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from redis.asyncio import Redis
 from sqlalchemy.future import select
 
+from cache import invalidate
 from database import AsyncSessionLocal
 from models import User
-from routes.auth.service import hash_password
+from redis_client import redis_pool
+from routes.auth.service import hash_password, principal_cache_key
 
 
 async def create_superuser(
@@ -26,17 +29,21 @@ async def create_superuser(
 
         if existing_user:
             print(f"User '{username}' already exists. Updating...")
-            existing_user.password_hash = hash_password(password)
+            existing_user.password_hash = await hash_password(password)
             existing_user.is_active = is_active
             existing_user.is_admin = is_admin
             await session.commit()
+
+            # Running workers may have cached the old status
+            async with Redis(connection_pool=redis_pool) as redis:
+                await invalidate(redis, principal_cache_key(existing_user.id))
             print(
                 f"Updated user '{username}': is_active={is_active}, is_admin={is_admin}"
             )
         else:
             new_user = User(
                 username=username,
-                password_hash=hash_password(password),
+                password_hash=await hash_password(password),
                 is_active=is_active,
                 is_admin=is_admin,
             )
@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from database import close_db, engine
+from redis_client import redis_pool
+from routes.metrics.service import WORKER_ID, metrics_publisher
+from routes.redirect.events import (
+    CLICK_EVENTS_STREAM,
+    CLICK_INGEST_GROUP,
+    click_events_ingested,
+    click_ingest_batch_seconds,
+)
+from settings import CLICK_INGEST_BATCH_SIZE, CLICK_INGEST_BLOCK
+
+logger = logging.getLogger(__name__)
+
+COPY_COLUMNS = ["short_code", "clicked_at", "referrer", "user_agent", "country"]
+# Events delivered to a consumer that has not acked them for this long are
+# taken over, e.g. after an ingester crashed mid-batch
+CLAIM_IDLE_MS = 60_000
+RETRY_DELAY = 5  # seconds to wait after a failed batch
+REPORT_INTERVAL = 60  # seconds between throughput log lines
+
+
+def _record(entry_id: str, fields: dict) -> tuple:
+    """A COPY row for a stream entry; the click time is its id's timestamp."""
+    milliseconds = int(entry_id.split("-", 1)[0])
+    return (
+        fields["c"],
+        datetime.fromtimestamp(milliseconds / 1000, timezone.utc),
+        fields.get("r"),
+        fields.get("u"),
+        fields.get("g"),
+    )
+
+
+async def ensure_group(redis: Redis) -> None:
+    """Create the consumer group (and stream) unless it exists."""
+    try:
+        await redis.xgroup_create(
+            CLICK_EVENTS_STREAM, CLICK_INGEST_GROUP, id="0", mkstream=True
+        )
+    except ResponseError as exc:
+        if "BUSYGROUP" not in str(exc):
+            raise
+
+
+async def copy_events(records: list[tuple]) -> None:
+    """Load rows into click_events with COPY, in one committed transaction."""
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+        async with driver.transaction():
+            await driver.copy_records_to_table(
+                "click_events", records=records, columns=COPY_COLUMNS
+            )
+
+
+async def ingest_batch(redis: Redis, batch_size: int, block_ms: int) -> int:
+    """
+    Load one batch of events: first any abandoned by another consumer,
+    otherwise new ones, waiting up to block_ms for them. Events are acked
+    only after their COPY commits, so a crash never loses them (a batch
+    may be loaded twice if the process dies between commit and ack).
+
+    Returns the number of events loaded.
+    """
+    _, entries, *_ = await redis.xautoclaim(
+        CLICK_EVENTS_STREAM,
+        CLICK_INGEST_GROUP,
+        WORKER_ID,
+        min_idle_time=CLAIM_IDLE_MS,
+        start_id="0-0",
+        count=batch_size,
+    )
+    if not entries:
+        response = await redis.xreadgroup(
+            CLICK_INGEST_GROUP,
+            WORKER_ID,
+            {CLICK_EVENTS_STREAM: ">"},
+            count=batch_size,
+            block=block_ms,
+        )
+        entries = response[0][1] if response else []
+    if not entries:
+        return 0
+
+    started = time.perf_counter()
+    # Entries trimmed by MAXLEN before being claimed come back without fields
+    records = [_record(entry_id, fields) for entry_id, fields in entries if fields]
+    if records:
+        await copy_events(records)
+    await redis.xack(
+        CLICK_EVENTS_STREAM, CLICK_INGEST_GROUP, *[entry_id for entry_id, _ in entries]
+    )
+
+    click_events_ingested.inc(len(records))
+    click_ingest_batch_seconds.observe(time.perf_counter() - started)
+    return len(records)
+
+
+async def ingest_clicks(batch_size: int, block: float) -> None:
+    """Load click events from the stream until interrupted."""
+    # Publishes this process's counters to /metrics alongside the API workers
+    metrics_publisher.start()
+    try:
+        async with Redis(connection_pool=redis_pool) as redis:
+            await ensure_group(redis)
+            logger.info("Ingesting click events as consumer %s", WORKER_ID)
+
+            loaded = 0
+            reported_at = time.monotonic()
+            while True:
+                try:
+                    loaded += await ingest_batch(redis, batch_size, int(block * 1000))
+                except Exception:
+                    logger.exception("Click event batch failed, retrying")
+                    await asyncio.sleep(RETRY_DELAY)
+
+                elapsed = time.monotonic() - reported_at
+                if elapsed >= REPORT_INTERVAL:
+                    logger.info(
+                        "Loaded %d click events (%.0f/s)", loaded, loaded / elapsed
+                    )
+                    loaded = 0
+                    reported_at = time.monotonic()
+    finally:
+        await metrics_publisher.stop()
+        await close_db()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Load click events from the Redis stream into Postgres"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=CLICK_INGEST_BATCH_SIZE,
+        help="Events loaded per COPY",
+    )
+    parser.add_argument(
+        "--block",
+        type=float,
+        default=CLICK_INGEST_BLOCK,
+        help="Seconds to wait for new events",
+    )
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    try:
+        asyncio.run(ingest_clicks(args.batch_size, args.block))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from redis.asyncio import Redis
+from sqlalchemy.future import select
+
+from database import AsyncSessionLocal
+from models import Link, LinkCounter
+from redis_client import redis_pool
+from routes.redirect.clicks import get_pending_clicks
+from routes.redirect.leaderboard import GLOBAL_LEADERBOARD_KEY, leaderboard_key
+
+REBUILD_SUFFIX = ":rebuild"
+
+
+async def rebuild_leaderboards(batch_size: int = 5000) -> None:
+    """
+    Rebuild the lifetime leaderboards from link_counters plus pending clicks.
+
+    Sets are built under temporary keys and renamed over the live ones, so
+    readers never see a partial leaderboard. Clicks recorded while the
+    rebuild runs may be missing from the result. Daily leaderboards are
+    left untouched, since the database has no per-day counts.
+    """
+    async with (
+        AsyncSessionLocal() as session,
+        Redis(connection_pool=redis_pool) as redis,
+    ):
+        # Clean up after an interrupted rebuild
+        async for key in redis.scan_iter(match=f"top:*{REBUILD_SUFFIX}"):
+            await redis.delete(key)
+
+        result = await session.stream(
+            select(Link.short_code, Link.user_id, LinkCounter.clicks)
+            .outerjoin(LinkCounter, LinkCounter.link_id == Link.id)
+            .execution_options(yield_per=batch_size)
+        )
+
+        rebuilt_keys = set()
+        link_count = 0
+        async for batch in result.partitions():
+            pending = await get_pending_clicks(redis, [row.short_code for row in batch])
+            async with redis.pipeline(transaction=False) as pipe:
+                for row in batch:
+                    clicks = (row.clicks or 0) + pending[row.short_code]
+                    if not clicks:
+                        continue
+                    keys = [leaderboard_key()]
+                    if row.user_id is not None:
+                        keys.append(leaderboard_key(row.user_id))
+                    for key in keys:
+                        pipe.zadd(key + REBUILD_SUFFIX, {row.short_code: clicks})
+                        rebuilt_keys.add(key)
+                await pipe.execute()
+            link_count += len(batch)
+
+        # Lifetime per-user sets that no longer have any clicked links
+        stale_keys = [
+            key
+            async for key in redis.scan_iter(match="top:user:*")
+            if key.count(":") == 2 and key not in rebuilt_keys
+        ]
+        if GLOBAL_LEADERBOARD_KEY not in rebuilt_keys:
+            stale_keys.append(GLOBAL_LEADERBOARD_KEY)
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for key in rebuilt_keys:
+                pipe.rename(key + REBUILD_SUFFIX, key)
+            for key in stale_keys:
+                pipe.delete(key)
+            await pipe.execute()
+
+        print(
+            f"Rebuilt {len(rebuilt_keys)} leaderboards from {link_count} links, "
+            f"removed {len(stale_keys)} stale leaderboards"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild the Redis click leaderboards from the database"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=5000,
+        help="Links read from the database per batch",
+    )
+
+    args = parser.parse_args()
+
+    asyncio.run(rebuild_leaderboards(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Metrics are plain Python ints and floats updated from the event loop
+thread, so no locks are needed. Bind label values once with .labels()
+at import time and keep the child; updating it then allocates nothing.
+
+Each worker only sees its own numbers. routes.metrics publishes worker
+snapshots to Redis and renders them all when /metrics is scraped, each
+series labelled with its `worker`. A restarted worker starts a new series
+rather than resetting a shared one, so aggregate in PromQL after rate(),
+e.g. sum without (worker) (rate(http_requests_total[5m])).
+"""
+
+import bisect
+from typing import Callable
+
+# Default latency buckets, in seconds
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Metric:
+    """A named metric with one child per combination of label values."""
+
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.children: dict[tuple[str, ...], object] = {}
+        _registry[name] = self
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Get the child for these label values, creating it on first use."""
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self._new_child()
+        return child
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    type = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+
+class Gauge(Metric):
+    """Current value."""
+
+    type = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+
+class Histogram(Metric):
+    """Distribution of observed values."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+
+_registry: dict[str, Metric] = {}
+_collectors: list[Callable[[], None]] = []
+
+
+def register_collector(collector: Callable[[], None]) -> None:
+    """Register a function that refreshes metrics just before a snapshot."""
+    _collectors.append(collector)
+
+
+def snapshot() -> dict:
+    """This worker's metric values, as JSON-serializable data."""
+    for collector in _collectors:
+        collector()
+
+    data = {}
+    for metric in _registry.values():
+        if isinstance(metric, Histogram):
+            values = [
+                [list(labels), child.counts, child.sum]
+                for labels, child in metric.children.items()
+            ]
+        else:
+            values = [
+                [list(labels), child.value] for labels, child in metric.children.items()
+            ]
+        data[metric.name] = values
+    return data
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: list) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def render(snapshots: dict[str, dict]) -> str:
+    """
+    Render worker snapshots (worker id -> snapshot()) in the Prometheus
+    text exposition format, with a `worker` label on every series.
+
+    Series are not summed across workers: a merged counter would drop
+    whenever a worker restarts or stops, which rate() reads as a reset.
+    """
+    lines = []
+    for name, metric in _registry.items():
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.type}")
+        names = (*metric.labelnames, "worker")
+
+        for worker, data in sorted(snapshots.items()):
+            for labels, *value in sorted(data.get(name, [])):
+                labels = [*labels, worker]
+                if isinstance(metric, Histogram):
+                    counts, total = value
+                    cumulative = 0
+                    for bound, count in zip([*metric.buckets, "+Inf"], counts):
+                        cumulative += count
+                        label_str = _format_labels((*names, "le"), [*labels, bound])
+                        lines.append(f"{name}_bucket{label_str} {cumulative}")
+                    label_str = _format_labels(names, labels)
+                    lines.append(f"{name}_sum{label_str} {total}")
+                    lines.append(f"{name}_count{label_str} {cumulative}")
+                else:
+                    lines.append(f"{name}{_format_labels(names, labels)} {value[0]}")
+
+    return "\n".join(lines) + "\n"
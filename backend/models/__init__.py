@@ -1,4 +1,7 @@
+from models.click_event import ClickEvent
+from models.click_rollup import LinkClickRollup
 from models.link import Link
+from models.link_counter import LinkCounter
 from models.user import User
 
-__all__ = ["User", "Link"]
+__all__ = ["User", "Link", "LinkCounter", "LinkClickRollup", "ClickEvent"]
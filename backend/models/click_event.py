@@ -0,0 +1,24 @@
+from sqlalchemy import BigInteger, Column, DateTime, Identity, Index, String, Text
+
+from models.base import Base
+
+
+class ClickEvent(Base):
+    """
+    One redirect, loaded in batches from the click events stream.
+    Keyed by short code rather than link, so events outlive deleted links.
+    """
+
+    __tablename__ = "click_events"
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    short_code = Column(String, nullable=False)
+    clicked_at = Column(DateTime(timezone=True), nullable=False)
+    referrer = Column(Text)
+    user_agent = Column(Text)
+    country = Column(String(2))
+
+    __table_args__ = (
+        # Events of one link over a time range
+        Index("ix_click_events_short_code_clicked_at", short_code, clicked_at),
+    )
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from models.base import Base
+
+
+class LinkClickRollup(Base):
+    """Clicks of one link within one minute, hour or day."""
+
+    __tablename__ = "link_click_rollups"
+
+    link_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("links.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    granularity = Column(String(6), primary_key=True)  # minute, hour or day
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    clicks = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Retention deletes old buckets of one granularity
+        Index(
+            "ix_link_click_rollups_granularity_bucket_start", granularity, bucket_start
+        ),
+    )
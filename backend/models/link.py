@@ -1,12 +1,23 @@
 import uuid
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    LargeBinary,
+    Sequence,
+    String,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from models.base import Base
 
+# Hands out blocks of indices for short code allocation (see short_codes.py)
+short_code_block_seq = Sequence("short_code_block_seq", metadata=Base.metadata)
+
 
 class Link(Base):
     __tablename__ = "links"
@@ -15,8 +26,35 @@ class Link(Base):
     short_code = Column(String, unique=True, index=True)
     original_url = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    clicks = Column(Integer, default=0)
+    # Deleted by the reaper once past; never expires if null
+    expires_at = Column(DateTime(timezone=True), nullable=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    # SHA-256 of original_url, set on the one link per user and URL that
+    # dedupe requests return (see routes/links/routes.py)
+    url_hash = Column(LargeBinary(32), nullable=True)
 
     # Relationship to user who created this link
     user = relationship("User", back_populates="created_links")
+
+    __table_args__ = (
+        # Keyset pagination of a user's links and of all links
+        Index("ix_links_user_id_created_at_id", user_id, created_at.desc(), id.desc()),
+        Index("ix_links_created_at_id", created_at.desc(), id.desc()),
+        # Dedupe lookups, and at most one shared link per user and URL
+        Index(
+            "ix_links_user_id_url_hash",
+            user_id,
+            url_hash,
+            unique=True,
+            postgresql_where=url_hash.isnot(None),
+        ),
+        # The reaper's scan for expired links
+        Index(
+            "ix_links_expires_at",
+            expires_at,
+            postgresql_where=expires_at.isnot(None),
+        ),
+    )
+
+    # Fetch server defaults (created_at) with RETURNING instead of a refresh
+    __mapper_args__ = {"eager_defaults": True}
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, ForeignKey, Integer, func
+from sqlalchemy.dialects.postgresql import UUID
+
+from models.base import Base
+
+
+class LinkCounter(Base):
+    """
+    Lifetime clicks of one link, kept out of the wide links row so click
+    writes only rewrite this narrow one. Created with a low fillfactor
+    (see the migration) so updates stay HOT. Links never clicked have no row.
+    """
+
+    __tablename__ = "link_counters"
+
+    link_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("links.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    clicks = Column(Integer, nullable=False, default=0)
+
+
+# A link's clicks, for queries outer-joining link_counters to links
+link_clicks = func.coalesce(LinkCounter.clicks, 0).label("clicks")
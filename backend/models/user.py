@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Boolean, Column, DateTime, String
+from sqlalchemy import Boolean, Column, DateTime, Index, String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -18,5 +18,10 @@ class User(Base):
     is_admin = Column(Boolean, default=False)  # Admin users can manage other users
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # Keyset pagination of the user list
+        Index("ix_users_created_at_id", created_at.desc(), id.desc()),
+    )
+
     # Relationship to links created by this user
     created_links = relationship("Link", back_populates="user")
@@ -1,11 +1,43 @@
+import time
 from typing import AsyncGenerator
 
 from redis.asyncio import ConnectionPool, Redis
 
+from metrics import Histogram
 from settings import REDIS_URL
 
+redis_roundtrip_seconds = Histogram(
+    "redis_roundtrip_seconds",
+    "Time from sending a Redis command or pipeline to its first reply",
+).labels()
+
+
+class _TimedConnectionMixin:
+    """Record how long each command or pipeline waits for its reply."""
+
+    _sent_at: float | None = None
+
+    async def send_packed_command(self, *args, **kwargs):
+        self._sent_at = time.perf_counter()
+        return await super().send_packed_command(*args, **kwargs)
+
+    async def read_response(self, *args, **kwargs):
+        response = await super().read_response(*args, **kwargs)
+        # Only the first reply after a send: pub/sub waits are not latency
+        if self._sent_at is not None:
+            redis_roundtrip_seconds.observe(time.perf_counter() - self._sent_at)
+            self._sent_at = None
+        return response
+
+
 # Create Redis connection pool at module level (like database engine)
 redis_pool = ConnectionPool.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+# Time the connection class picked for the URL scheme (TCP, TLS or socket)
+redis_pool.connection_class = type(
+    f"Timed{redis_pool.connection_class.__name__}",
+    (_TimedConnectionMixin, redis_pool.connection_class),
+    {},
+)
 
 
 async def get_redis() -> AsyncGenerator[Redis, None]:
@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator
+
+from redis.asyncio import Redis
+from sqlalchemy.future import select
+
+from database import read_sessionmaker
+from models import Link, LinkCounter, User
+from models.link_counter import link_clicks
+from redis_client import redis_pool
+from routes.redirect.clicks import get_pending_clicks
+from routes.redirect.visitors import get_unique_visitors
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = [
+    "short_code",
+    "original_url",
+    "clicks",
+    "unique_visitors",
+    "created_at",
+    "created_by_username",
+]
+
+
+def _format_csv(rows: list[dict], header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def _format_ndjson(rows: list[dict]) -> str:
+    return "".join(json.dumps(row, default=str) + "\n" for row in rows)
+
+
+async def export_link_stats(format: str) -> AsyncIterator[str]:
+    """
+    Stream statistics for all links as CSV or NDJSON text chunks.
+
+    Rows come from a server-side cursor one batch at a time, so memory use
+    does not grow with the table. Opens its own session because request
+    dependencies are closed before a streaming response is sent.
+    """
+    query = (
+        select(
+            Link.short_code,
+            Link.original_url,
+            link_clicks,
+            Link.created_at,
+            User.username.label("created_by_username"),
+        )
+        .outerjoin(LinkCounter, LinkCounter.link_id == Link.id)
+        .outerjoin(User, Link.user_id == User.id)
+        .order_by(Link.created_at.desc(), Link.id.desc())
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+    async with read_sessionmaker()() as db, Redis(connection_pool=redis_pool) as redis:
+        result = await db.stream(query)
+        first = True
+        async for batch in result.mappings().partitions():
+            # Include clicks not yet flushed to the database
+            short_codes = [row["short_code"] for row in batch]
+            pending = await get_pending_clicks(redis, short_codes)
+            visitors = await get_unique_visitors(redis, short_codes)
+            rows = [
+                {
+                    **row,
+                    "clicks": row["clicks"] + pending[row["short_code"]],
+                    "unique_visitors": visitors[row["short_code"]],
+                }
+                for row in batch
+            ]
+
+            if format == "csv":
+                yield _format_csv(rows, header=first)
+            else:
+                yield _format_ndjson(rows)
+            first = False
+
+        if first and format == "csv":
+            yield _format_csv([], header=True)
+
+
+async def gzip_stream(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    """Gzip text chunks on the fly, flushing after each one."""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    async for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
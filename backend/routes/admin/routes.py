@@ -1,12 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
 
-from database import get_db
-from models import Link, User
-from routes.admin.schemas import LinkStats
+from database import get_pool_stats, get_read_db
+from models import Link, LinkCounter, User
+from models.link_counter import link_clicks
+from redis_client import get_redis
+from routes.admin.export import export_link_stats, gzip_stream
+from routes.admin.schemas import LinkStats, PoolStats
 from routes.auth.service import get_current_user
+from routes.links.schemas import TopLink
+from routes.pagination import PageParams, page_items, paginate
+from routes.redirect.clicks import get_pending_clicks
+from routes.redirect.leaderboard import get_top_links
+from routes.redirect.visitors import get_unique_visitors
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -23,23 +35,93 @@ async def require_admin(current_user: User = Depends(get_current_user)) -> User:
 
 @router.get("/stats", response_model=list[LinkStats])
 async def get_stats(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    redis: Redis = Depends(get_redis),
     current_user: User = Depends(require_admin),
 ) -> list[dict]:
-    """Get statistics for all links. Requires admin authentication."""
-    result = await db.execute(
-        select(Link).options(selectinload(Link.user)).order_by(Link.created_at.desc())
+    """
+    Get statistics for all links, newest first. Requires admin authentication.
+    Paginated like /links.
+    """
+    query = (
+        select(
+            Link.id,
+            Link.short_code,
+            Link.original_url,
+            link_clicks,
+            Link.created_at,
+            User.username.label("created_by_username"),
+        )
+        .outerjoin(LinkCounter, LinkCounter.link_id == Link.id)
+        .outerjoin(User, Link.user_id == User.id)
     )
-    links = result.scalars().all()
+    result = await db.execute(paginate(query, Link, page))
+    links = page_items(result.all(), page, response)
+
+    # Include clicks not yet flushed to the database
+    short_codes = [link.short_code for link in links]
+    pending = await get_pending_clicks(redis, short_codes)
+    visitors = await get_unique_visitors(redis, short_codes)
 
-    # Convert to dict with created_by_username
     return [
         {
             "short_code": link.short_code,
             "original_url": link.original_url,
-            "clicks": link.clicks,
+            "clicks": link.clicks + pending[link.short_code],
+            "unique_visitors": visitors[link.short_code],
             "created_at": link.created_at,
-            "created_by_username": link.user.username if link.user else None,
+            "created_by_username": link.created_by_username,
         }
         for link in links
     ]
+
+
+@router.get("/stats/export")
+async def export_stats(
+    request: Request,
+    format: Literal["csv", "ndjson"] = "ndjson",
+    current_user: User = Depends(require_admin),
+) -> StreamingResponse:
+    """
+    Stream statistics for all links as NDJSON or CSV. Requires admin
+    authentication. Gzip-compressed when the client accepts it.
+    """
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {
+        "Content-Disposition": f'attachment; filename="link-stats.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+
+    content = export_link_stats(format)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        content = gzip_stream(content)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(content, media_type=media_type, headers=headers)
+
+
+@router.get("/top", response_model=list[TopLink])
+async def get_global_top_links(
+    limit: int = Query(10, ge=1, le=100),
+    day: date | None = None,
+    redis: Redis = Depends(get_redis),
+    current_user: User = Depends(require_admin),
+) -> list[dict]:
+    """
+    Get the most clicked links across all users, from the Redis leaderboard.
+    Pass `day` (UTC) for a single day's clicks. Requires admin authentication.
+    """
+    return await get_top_links(redis, limit, day=day)
+
+
+@router.get("/pool", response_model=PoolStats)
+async def get_database_pool_stats(
+    current_user: User = Depends(require_admin),
+) -> dict:
+    """
+    Get database connection pool usage of the worker serving the request.
+    Requires admin authentication.
+    """
+    return get_pool_stats()
@@ -11,5 +11,27 @@ class LinkStats(BaseModel):
     short_code: str
     original_url: str
     clicks: int
+    # Approximate: counted with a HyperLogLog
+    unique_visitors: int = 0
     created_at: datetime
     created_by_username: str | None = None
+
+
+class PoolWaitHistogram(BaseModel):
+    """Cumulative histogram of connection checkout waits, in seconds."""
+
+    count: int
+    sum: float
+    timeouts: int
+    buckets: dict[str, int]
+
+
+class PoolStats(BaseModel):
+    """Response schema for database connection pool usage."""
+
+    size: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    max_overflow: int
+    wait_seconds: PoolWaitHistogram
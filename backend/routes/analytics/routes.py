@@ -0,0 +1,129 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_read_db
+from models import User
+from redis_client import get_redis
+from routes.analytics.schemas import ClickSeries, VisitorStats
+from routes.analytics.service import find_links, get_click_series
+from routes.links.routes import require_active_user
+from routes.redirect.visitors import get_unique_visitors_range
+from settings import UNIQUE_VISITORS_DAY_RETENTION
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+Granularity = Literal["minute", "hour", "day"]
+
+# Range returned when no start is given
+DEFAULT_RANGES = {
+    "minute": timedelta(hours=1),
+    "hour": timedelta(days=7),
+    "day": timedelta(days=90),
+}
+MAX_CODES = 100
+DEFAULT_VISITOR_DAYS = 7  # days returned when no start is given
+
+
+def _time_range(
+    granularity: Granularity, start: datetime | None, end: datetime | None
+) -> tuple[datetime, datetime]:
+    end = end or datetime.now(timezone.utc)
+    start = start or end - DEFAULT_RANGES[granularity]
+    return start, end
+
+
+@router.get("/clicks/{short_code}", response_model=ClickSeries)
+async def get_link_clicks(
+    short_code: str,
+    granularity: Granularity = "hour",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(require_active_user),
+) -> dict:
+    """
+    Get clicks per minute, hour or day for one link, from the rollups.
+    Users can only query their own links (admins can query any).
+    """
+    owner_id = None if current_user.is_admin else current_user.id
+    links = await find_links(db, [short_code], owner_id)
+    if not links:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Link not found",
+        )
+
+    [series] = await get_click_series(
+        db, links, granularity, *_time_range(granularity, start, end)
+    )
+    return series
+
+
+@router.get("/clicks", response_model=list[ClickSeries])
+async def get_links_clicks(
+    codes: list[str] = Query(..., max_length=MAX_CODES),
+    granularity: Granularity = "hour",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(require_active_user),
+) -> list[dict]:
+    """
+    Get clicks per minute, hour or day for several links (?codes=a&codes=b).
+    Codes that don't exist or belong to someone else are left out
+    (admins can query any link).
+    """
+    owner_id = None if current_user.is_admin else current_user.id
+    links = await find_links(db, codes, owner_id)
+    if not links:
+        return []
+
+    return await get_click_series(
+        db, links, granularity, *_time_range(granularity, start, end)
+    )
+
+
+@router.get("/visitors/{short_code}", response_model=VisitorStats)
+async def get_link_visitors(
+    short_code: str,
+    start: date | None = None,
+    end: date | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    redis: Redis = Depends(get_redis),
+    current_user: User = Depends(require_active_user),
+) -> dict:
+    """
+    Get approximate unique visitors of one link from start to end
+    (inclusive UTC days, the last 7 by default), for the whole range
+    and per day. Daily counts are kept for UNIQUE_VISITORS_DAY_RETENTION days.
+    Users can only query their own links (admins can query any).
+    """
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=DEFAULT_VISITOR_DAYS - 1)
+    if start > end or (end - start).days >= UNIQUE_VISITORS_DAY_RETENTION:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range must span 1 to {UNIQUE_VISITORS_DAY_RETENTION} days",
+        )
+
+    owner_id = None if current_user.is_admin else current_user.id
+    if not await find_links(db, [short_code], owner_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Link not found",
+        )
+
+    total, daily = await get_unique_visitors_range(redis, short_code, start, end)
+    return {
+        "short_code": short_code,
+        "start": start,
+        "end": end,
+        "unique_visitors": total,
+        "days": [
+            {"day": day, "unique_visitors": count} for day, count in daily.items()
+        ],
+    }
@@ -0,0 +1,36 @@
+from datetime import date, datetime
+
+from pydantic import BaseModel
+
+
+class ClickPoint(BaseModel):
+    """Clicks within one time bucket."""
+
+    bucket_start: datetime
+    clicks: int
+
+
+class ClickSeries(BaseModel):
+    """Response schema for a link's click time series."""
+
+    short_code: str
+    granularity: str
+    points: list[ClickPoint]
+
+
+class DailyVisitors(BaseModel):
+    """Approximate unique visitors on one UTC day."""
+
+    day: date
+    unique_visitors: int
+
+
+class VisitorStats(BaseModel):
+    """Response schema for a link's approximate unique visitors over a range."""
+
+    short_code: str
+    start: date
+    end: date
+    # Visitors on several days of the range are counted once
+    unique_visitors: int
+    days: list[DailyVisitors]
@@ -0,0 +1,203 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import LockError
+from sqlalchemy import DateTime, Integer, String, bindparam, delete, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from background import BackgroundTask
+from database import AsyncSessionLocal
+from models import Link, LinkClickRollup
+from redis_client import redis_pool
+from settings import (
+    CLICK_BUCKET_TTL,
+    CLICK_ROLLUP_INTERVAL,
+    CLICK_ROLLUP_RETENTION_DAYS,
+)
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("minute", "hour", "day")
+
+# Clicks are counted per minute in Redis hashes of short_code -> clicks,
+# then rolled up into link_click_rollups at every granularity.
+ROLLUP_CURSOR_KEY = "clicks:rollup:cursor"  # last minute rolled up
+ROLLUP_LOCK_KEY = "clicks:rollup:lock"
+ROLLUP_LOCK_TIMEOUT = 120  # seconds
+# Minutes are rolled up this long after they end, so clicks still in
+# flight from other workers land first
+ROLLUP_GRACE = timedelta(minutes=1)
+
+# Add one minute of clicks to the minute, hour and day rollups
+ROLLUP_SQL = text(
+    """
+    INSERT INTO link_click_rollups (link_id, granularity, bucket_start, clicks)
+    SELECT links.id, g.granularity, date_trunc(g.granularity, :minute, 'UTC'),
+        bucket.clicks
+    FROM unnest(:codes, :counts) AS bucket(short_code, clicks)
+    JOIN links ON links.short_code = bucket.short_code
+    CROSS JOIN unnest(:granularities) AS g(granularity)
+    ON CONFLICT (link_id, granularity, bucket_start)
+    DO UPDATE SET clicks = link_click_rollups.clicks + excluded.clicks
+    """
+).bindparams(
+    bindparam("minute", type_=DateTime(timezone=True)),
+    bindparam("codes", type_=ARRAY(String)),
+    bindparam("counts", type_=ARRAY(Integer)),
+    bindparam("granularities", type_=ARRAY(String)),
+)
+
+
+def minute_start(moment: datetime) -> datetime:
+    """Start of the UTC minute containing a moment."""
+    return moment.astimezone(timezone.utc).replace(second=0, microsecond=0)
+
+
+def bucket_key(minute: datetime) -> str:
+    """Redis hash holding one minute of clicks."""
+    return f"clicks:minute:{minute:%Y%m%d%H%M}"
+
+
+def queue_bucket_click(pipe: Pipeline, short_code: str) -> None:
+    """Queue counting a click in the current minute's bucket."""
+    key = bucket_key(minute_start(datetime.now(timezone.utc)))
+    pipe.hincrby(key, short_code, 1)
+    pipe.expire(key, CLICK_BUCKET_TTL, nx=True)
+
+
+async def compact_buckets(redis: Redis) -> int:
+    """
+    Roll closed minute buckets from Redis up into link_click_rollups,
+    then apply retention. A bucket is deleted only after its rows commit,
+    so a crash can repeat a minute but never lose it.
+
+    Returns the number of clicks rolled up.
+    """
+    lock = redis.lock(ROLLUP_LOCK_KEY, timeout=ROLLUP_LOCK_TIMEOUT, blocking=False)
+    if not await lock.acquire():
+        # Another worker is compacting
+        return 0
+
+    try:
+        now = datetime.now(timezone.utc)
+        last_closed = minute_start(now - ROLLUP_GRACE) - timedelta(minutes=1)
+
+        # Buckets older than this have already expired from Redis
+        minute = minute_start(now - timedelta(seconds=CLICK_BUCKET_TTL))
+        cursor = await redis.get(ROLLUP_CURSOR_KEY)
+        if cursor:
+            minute = max(minute, datetime.fromisoformat(cursor) + timedelta(minutes=1))
+
+        compacted = 0
+        async with AsyncSessionLocal() as db:
+            while minute <= last_closed:
+                key = bucket_key(minute)
+                bucket = await redis.hgetall(key)
+                if bucket:
+                    await db.execute(
+                        ROLLUP_SQL,
+                        {
+                            "minute": minute,
+                            "codes": list(bucket),
+                            "counts": [int(count) for count in bucket.values()],
+                            "granularities": list(GRANULARITIES),
+                        },
+                    )
+                    await db.commit()
+                    await redis.delete(key)
+                    compacted += sum(int(count) for count in bucket.values())
+
+                await redis.set(ROLLUP_CURSOR_KEY, minute.isoformat())
+                await lock.reacquire()
+                minute += timedelta(minutes=1)
+
+            await _apply_retention(db, now)
+
+        return compacted
+    finally:
+        try:
+            await lock.release()
+        except LockError:
+            logger.warning("Rollup lock expired before release")
+
+
+async def _apply_retention(db: AsyncSession, now: datetime) -> None:
+    """Delete rollups older than their granularity's retention."""
+    for granularity, days in CLICK_ROLLUP_RETENTION_DAYS.items():
+        if days <= 0:
+            continue
+        await db.execute(
+            delete(LinkClickRollup).where(
+                LinkClickRollup.granularity == granularity,
+                LinkClickRollup.bucket_start < now - timedelta(days=days),
+            )
+        )
+    await db.commit()
+
+
+async def compact_pending_buckets() -> int:
+    """Compact buckets using a connection from the shared pool."""
+    async with Redis(connection_pool=redis_pool) as redis:
+        return await compact_buckets(redis)
+
+
+click_compactor = BackgroundTask(
+    "click-compactor", compact_pending_buckets, CLICK_ROLLUP_INTERVAL
+)
+
+
+async def get_click_series(
+    db: AsyncSession,
+    links: list[tuple[UUID, str]],
+    granularity: str,
+    start: datetime,
+    end: datetime,
+) -> list[dict]:
+    """
+    Get click time series for (link_id, short_code) pairs from the rollups.
+    Buckets without clicks are omitted.
+    """
+    result = await db.execute(
+        select(
+            LinkClickRollup.link_id,
+            LinkClickRollup.bucket_start,
+            LinkClickRollup.clicks,
+        )
+        .where(
+            LinkClickRollup.link_id.in_([link_id for link_id, _ in links]),
+            LinkClickRollup.granularity == granularity,
+            LinkClickRollup.bucket_start >= start,
+            LinkClickRollup.bucket_start < end,
+        )
+        .order_by(LinkClickRollup.link_id, LinkClickRollup.bucket_start)
+    )
+
+    points: dict[UUID, list[dict]] = {link_id: [] for link_id, _ in links}
+    for row in result:
+        points[row.link_id].append(
+            {"bucket_start": row.bucket_start, "clicks": row.clicks}
+        )
+
+    return [
+        {"short_code": short_code, "granularity": granularity, "points": points[id]}
+        for id, short_code in links
+    ]
+
+
+async def find_links(
+    db: AsyncSession, short_codes: list[str], user_id: UUID | None
+) -> list[tuple[UUID, str]]:
+    """
+    Resolve short codes to (link_id, short_code) pairs, restricted to
+    links owned by user_id unless it is None.
+    """
+    query = select(Link.id, Link.short_code).where(Link.short_code.in_(short_codes))
+    if user_id is not None:
+        query = query.where(Link.user_id == user_id)
+    result = await db.execute(query)
+    return [(row.id, row.short_code) for row in result]
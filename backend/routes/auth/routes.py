@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from database import get_db
+from database import get_write_db
 from models import User
 from routes.auth.schemas import LoginRequest, TokenResponse, UserCreate, UserResponse
 from routes.auth.service import (
@@ -18,7 +18,7 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 @router.post("/login", response_model=TokenResponse)
 async def login(
     login_data: LoginRequest,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
 ) -> TokenResponse:
     """Authenticate user and return JWT token."""
     user = await authenticate_user(db, login_data.username, login_data.password)
@@ -45,7 +45,7 @@ async def login(
 )
 async def register(
     user_data: UserCreate,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
 ) -> User:
     """Register a new user (for initial setup only)."""
     # Check if user already exists
@@ -59,7 +59,7 @@ async def register(
     # Create new user
     new_user = User(
         username=user_data.username,
-        password_hash=hash_password(user_data.password),
+        password_hash=await hash_password(user_data.password),
     )
     db.add(new_user)
     await db.commit()
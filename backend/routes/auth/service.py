@@ -1,3 +1,6 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
 from uuid import UUID
@@ -9,27 +12,97 @@ from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from database import get_db
+from cache import LocalCache, register_local_cache
+from database import get_write_db
 from models import User
-from settings import JWT_ALGORITHM, JWT_EXPIRE_DAYS, JWT_SECRET_KEY
-
-# Password hashing context using bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from settings import (
+    BCRYPT_ROUNDS,
+    JWT_ALGORITHM,
+    JWT_EXPIRE_DAYS,
+    JWT_SECRET_KEY,
+    PASSWORD_HASH_EXECUTOR,
+    PASSWORD_HASH_QUEUE,
+    PASSWORD_HASH_WORKERS,
+    PRINCIPAL_CACHE_SIZE,
+    PRINCIPAL_CACHE_TTL,
+)
+
+# Password hashing context using bcrypt. Hashes made with a different
+# cost are upgraded on the next successful login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS
+)
+
+# bcrypt takes tens to hundreds of milliseconds, so it runs on a dedicated
+# pool instead of the event loop. At most PASSWORD_HASH_QUEUE calls wait
+# for a free worker; beyond that, requests are turned away with a 503.
+_hash_executor: Executor = (
+    ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+    if PASSWORD_HASH_EXECUTOR == "process"
+    else ThreadPoolExecutor(
+        max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"
+    )
+)
+_hash_slots = asyncio.Semaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
 
 # OAuth2 scheme for token extraction
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Per-worker caches for get_current_user: decoded tokens (token -> user id,
+# expiry) and user snapshots (user:{id} -> column values). User entries are
+# dropped in every worker through cache.invalidate() when a user changes.
+token_cache = LocalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+principal_cache = LocalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+register_local_cache("user", principal_cache)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+# Columns kept in principal_cache (never the password hash)
+PRINCIPAL_FIELDS = ("id", "username", "is_active", "is_admin", "created_at")
 
 
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
+def principal_cache_key(user_id: UUID) -> str:
+    """Cache key of a user's snapshot; pass to cache.invalidate() on changes."""
+    return f"user:{user_id}"
+
+
+def _hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _verify_and_update(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def _run_hasher(func, *args):
+    """Run a hashing function on the hash pool, rejecting work when saturated."""
+    if _hash_slots.locked():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins in progress, please retry",
+            headers={"Retry-After": "1"},
+        )
+    async with _hash_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+
+
+async def verify_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Verify a plain password against its hash.
+    Returns (valid, new_hash); new_hash is set when the stored hash
+    uses outdated parameters and should be replaced.
+    """
+    return await _run_hasher(_verify_and_update, plain_password, hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password using bcrypt."""
+    return await _run_hasher(_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -40,9 +113,29 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     return jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
 
 
+def decode_token(token: str) -> UUID | None:
+    """Get the user id from a JWT, or None if invalid. Memoized per token."""
+    cached = token_cache.get(token)
+    if cached is not None:
+        user_id, expires_at = cached
+        return user_id if expires_at > time.time() else None
+
+    try:
+        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        user_id_str: str | None = payload.get("sub")
+        if user_id_str is None:
+            return None
+        user_id = UUID(user_id_str)
+    except (JWTError, ValueError):
+        return None
+
+    token_cache.set(token, (user_id, payload.get("exp", float("inf"))))
+    return user_id
+
+
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
 ) -> User:
     """Dependency to get the current authenticated user from JWT token."""
     credentials_exception = HTTPException(
@@ -51,20 +144,28 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        user_id_str: str | None = payload.get("sub")
-        if user_id_str is None:
-            raise credentials_exception
-        user_id = UUID(user_id_str)
-    except (JWTError, ValueError):
+    user_id = decode_token(token)
+    if user_id is None:
         raise credentials_exception
 
-    result = await db.execute(select(User).filter(User.id == user_id))
-    user = result.scalar_one_or_none()
+    cache_key = principal_cache_key(user_id)
+    snapshot = principal_cache.get(cache_key)
+    if snapshot is None:
+        # Read before the query, so an invalidation handled meanwhile
+        # keeps the possibly stale row out of the cache
+        generation = principal_cache.generation(cache_key)
+        result = await db.execute(select(User).filter(User.id == user_id))
+        db_user = result.scalar_one_or_none()
 
-    if user is None:
-        raise credentials_exception
+        if db_user is None:
+            raise credentials_exception
+
+        snapshot = {field: getattr(db_user, field) for field in PRINCIPAL_FIELDS}
+        principal_cache.set(cache_key, snapshot, generation=generation)
+
+    # A fresh, detached instance per request, so handlers can't leak changes
+    # into the cache
+    user = User(**snapshot)
 
     if not user.is_active:
         raise HTTPException(
@@ -85,7 +186,13 @@ async def authenticate_user(
     if user is None:
         return None
 
-    if not verify_password(password, user.password_hash):
+    valid, new_hash = await verify_password(password, user.password_hash)
+    if not valid:
         return None
 
+    if new_hash:
+        # Rehash transparently when the bcrypt cost has changed
+        user.password_hash = new_hash
+        await db.commit()
+
     return user
@@ -1,22 +1,70 @@
-import random
-import string
+import hashlib
+import json
+from datetime import date
+from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import ValidationError
+from redis.asyncio import Redis
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from database import get_db
-from models import Link, User
+from database import get_read_db, get_write_db
+from models import Link, LinkCounter, User
+from models.link_counter import link_clicks
+from redis_client import get_redis
 from routes.auth.service import get_current_user
-from routes.links.schemas import LinkCreate, LinkResponse
+from routes.links.schemas import LinkBulkResponse, LinkCreate, LinkResponse, TopLink
+from routes.pagination import PageParams, page_items, paginate
+from routes.redirect.bloom import add_to_bloom
+from routes.redirect.clicks import get_pending_clicks
+from routes.redirect.leaderboard import get_top_links, remove_from_leaderboards
+from routes.redirect.service import (
+    CachedLink,
+    invalidate_links,
+    link_cache_key,
+    missing_cache_key,
+)
+from routes.redirect.visitors import get_unique_visitors, visitors_key
+from settings import LINKS_BULK_MAX_ITEMS
+from short_codes import short_code_allocator
 
 router = APIRouter(prefix="/links", tags=["links"])
 
+SHORT_CODE_MAX_ATTEMPTS = 3
 
-def generate_short_code(length: int = 9) -> str:
-    """Generate a random alphanumeric short code."""
-    chars = string.ascii_letters + string.digits
-    return "".join(random.choice(chars) for _ in range(length))
+
+def url_hash(url: str) -> bytes:
+    """Fixed-width key of a normalized URL, indexed for dedupe lookups."""
+    return hashlib.sha256(url.encode()).digest()
+
+
+def _dedupe_hash(link: LinkCreate) -> bytes | None:
+    """The URL hash to dedupe a new link on, or None to always create it."""
+    if not link.dedupe or link.expires_at is not None:
+        return None
+    # HttpUrl normalizes the scheme, host and empty path
+    return url_hash(str(link.url))
+
+
+async def _find_deduped(db: AsyncSession, user_id: UUID, hashes: list[bytes]) -> dict:
+    """A user's links that dedupe requests may return, by URL hash."""
+    if not hashes:
+        return {}
+    result = await db.execute(
+        select(
+            Link.url_hash,
+            Link.short_code,
+            Link.original_url,
+            link_clicks,
+            Link.created_at,
+        )
+        .outerjoin(LinkCounter, LinkCounter.link_id == Link.id)
+        .where(Link.user_id == user_id, Link.url_hash.in_(hashes))
+    )
+    return {row.url_hash: row for row in result}
 
 
 async def require_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -32,53 +80,302 @@ async def require_active_user(current_user: User = Depends(get_current_user)) ->
 @router.post("/create", response_model=LinkResponse)
 async def create_link(
     link: LinkCreate,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
+    redis: Redis = Depends(get_redis),
     current_user: User = Depends(require_active_user),
-) -> Link:
-    """Create a new short link. Requires active user authentication."""
-    short_code = generate_short_code()
-
-    # Ensure uniqueness with retry loop
-    max_retries = 10
-    for _ in range(max_retries):
-        result = await db.execute(select(Link).filter(Link.short_code == short_code))
-        if not result.scalar_one_or_none():
+) -> dict:
+    """
+    Create a new short link. Requires active user authentication.
+    With dedupe, returns the user's existing link for the same URL if any.
+    """
+    dedupe_hash = _dedupe_hash(link)
+    for _ in range(SHORT_CODE_MAX_ATTEMPTS):
+        if dedupe_hash is not None:
+            # Checked on every attempt: a concurrent request may have added it
+            existing = await _find_deduped(db, current_user.id, [dedupe_hash])
+            if dedupe_hash in existing:
+                row = existing[dedupe_hash]
+                pending = await get_pending_clicks(redis, [row.short_code])
+                visitors = await get_unique_visitors(redis, [row.short_code])
+                return {
+                    "short_code": row.short_code,
+                    "original_url": row.original_url,
+                    "clicks": row.clicks + pending[row.short_code],
+                    "unique_visitors": visitors[row.short_code],
+                    "created_at": row.created_at,
+                }
+
+        [short_code] = await short_code_allocator.allocate(db)
+
+        # Add to the filter before the link exists, so it can never be rejected
+        await add_to_bloom(redis, [short_code])
+
+        new_link = Link(
+            short_code=short_code,
+            original_url=str(link.url),
+            user_id=current_user.id,
+            expires_at=link.expires_at,
+            url_hash=dedupe_hash,
+        )
+        db.add(new_link)
+        try:
+            await db.commit()
             break
-        short_code = generate_short_code()
+        except IntegrityError:
+            # Allocated codes never repeat, but may clash with a legacy random
+            # code; with dedupe, another request may have added the URL first
+            await db.rollback()
     else:
         raise HTTPException(
             status_code=500, detail="Failed to generate unique short code"
         )
 
-    new_link = Link(
-        short_code=short_code,
-        original_url=str(link.url),
-        user_id=current_user.id,
+    await redis.delete(missing_cache_key(short_code))
+    return {
+        "short_code": new_link.short_code,
+        "original_url": new_link.original_url,
+        "clicks": 0,
+        "created_at": new_link.created_at,
+        "expires_at": new_link.expires_at,
+    }
+
+
+async def _read_bulk_items(request: Request) -> list:
+    """
+    Read bulk items from a JSON array or an NDJSON stream.
+    Lines that are not valid JSON are kept as raw bytes and
+    reported as per-item errors.
+    """
+    too_many = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"At most {LINKS_BULK_MAX_ITEMS} links per request",
     )
-    db.add(new_link)
-    await db.commit()
-    await db.refresh(new_link)
-    return new_link
+
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        items = []
+        buffer = b""
+        async for chunk in request.stream():
+            *lines, buffer = (buffer + chunk).split(b"\n")
+            items.extend(line for line in lines if line.strip())
+            if len(items) > LINKS_BULK_MAX_ITEMS:
+                raise too_many
+        if buffer.strip():
+            items.append(buffer)
+    else:
+        try:
+            items = await request.json()
+        except ValueError:
+            items = None
+        if not isinstance(items, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expected a JSON array or NDJSON of links",
+            )
+
+    if len(items) > LINKS_BULK_MAX_ITEMS:
+        raise too_many
+    return items
+
+
+def _parse_bulk_item(item: object) -> LinkCreate:
+    """Validate one bulk item, given as a URL string or a LinkCreate object."""
+    if isinstance(item, bytes):
+        item = json.loads(item)
+    if isinstance(item, str):
+        item = {"url": item}
+    return LinkCreate.model_validate(item)
+
+
+@router.post("/bulk", response_model=LinkBulkResponse)
+async def create_links_bulk(
+    request: Request,
+    cache: bool = False,
+    db: AsyncSession = Depends(get_write_db),
+    redis: Redis = Depends(get_redis),
+    current_user: User = Depends(require_active_user),
+) -> dict:
+    """
+    Create many short links in one transaction. Requires active user authentication.
+
+    Accepts a JSON array or an NDJSON stream (Content-Type: application/x-ndjson)
+    of URLs or {"url": ...} objects. Invalid items are reported individually
+    and do not stop the rest. Pass cache=true to pre-populate the Redis cache.
+    Items with dedupe reuse the user's existing link for the same URL, or
+    the link created for an earlier item of the request.
+    """
+    results = []
+    valid = []
+    created = []
+    for index, item in enumerate(await _read_bulk_items(request)):
+        try:
+            valid.append((index, _parse_bulk_item(item)))
+        except ValidationError as exc:
+            results.append({"index": index, "error": exc.errors()[0]["msg"]})
+        except ValueError:
+            results.append({"index": index, "error": "Invalid JSON"})
+
+    if valid:
+        hashes = [_dedupe_hash(link) for _, link in valid]
+        for _ in range(SHORT_CODE_MAX_ATTEMPTS):
+            # Checked on every attempt: a concurrent request may have added some
+            existing = await _find_deduped(
+                db, current_user.id, [h for h in hashes if h is not None]
+            )
+            new = []
+            new_hashes = set()
+            for (index, link), dedupe_hash in zip(valid, hashes):
+                if dedupe_hash in existing or dedupe_hash in new_hashes:
+                    continue
+                if dedupe_hash is not None:
+                    new_hashes.add(dedupe_hash)
+                new.append((index, link, dedupe_hash))
+
+            codes = await short_code_allocator.allocate(db, len(new)) if new else []
+
+            # Add to the filter before the links exist, so they can never be rejected
+            await add_to_bloom(redis, codes)
+
+            rows = [
+                {
+                    "short_code": short_code,
+                    "original_url": str(link.url),
+                    "user_id": current_user.id,
+                    "expires_at": link.expires_at,
+                    "url_hash": dedupe_hash,
+                }
+                for short_code, (_, link, dedupe_hash) in zip(codes, new)
+            ]
+            try:
+                created = []
+                if rows:
+                    # Sent as multi-row INSERT ... RETURNING statements
+                    result = await db.execute(
+                        insert(Link).returning(
+                            Link.short_code,
+                            Link.original_url,
+                            Link.user_id,
+                            Link.expires_at,
+                            sort_by_parameter_order=True,
+                        ),
+                        rows,
+                    )
+                    created = result.all()
+                    await db.commit()
+                break
+            except IntegrityError:
+                # Allocated codes never repeat, but may clash with a legacy random
+                # code; with dedupe, another request may have added a URL first
+                await db.rollback()
+        else:
+            raise HTTPException(
+                status_code=500, detail="Failed to generate unique short codes"
+            )
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for row in created:
+                pipe.delete(missing_cache_key(row.short_code))
+                if cache:
+                    cached = CachedLink.from_link(row)
+                    pipe.set(
+                        link_cache_key(row.short_code),
+                        cached.dumps(),
+                        ex=cached.cache_ttl(),
+                    )
+            await pipe.execute()
+
+        created_by_index = {}
+        for (index, _, dedupe_hash), row in zip(new, created):
+            created_by_index[index] = row
+            if dedupe_hash is not None:
+                existing[dedupe_hash] = row
+        for (index, _), dedupe_hash in zip(valid, hashes):
+            row = created_by_index.get(index)
+            reused = row is None
+            if reused:
+                row = existing[dedupe_hash]
+            results.append(
+                {
+                    "index": index,
+                    "short_code": row.short_code,
+                    "original_url": row.original_url,
+                    "existing": reused,
+                }
+            )
+
+    results.sort(key=lambda item: item["index"])
+    return {
+        "created": len(created),
+        "existing": len(valid) - len(created),
+        "failed": len(results) - len(valid),
+        "results": results,
+    }
 
 
 @router.get("", response_model=list[LinkResponse])
 async def get_my_links(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    redis: Redis = Depends(get_redis),
     current_user: User = Depends(require_active_user),
-) -> list[Link]:
-    """Get all links created by the current user."""
-    result = await db.execute(
-        select(Link)
+) -> list[dict]:
+    """
+    Get links created by the current user, newest first.
+    Paginated: pass the X-Next-Cursor response header as `cursor`
+    to get the next page.
+    """
+    query = (
+        select(
+            Link.id,
+            Link.short_code,
+            Link.original_url,
+            link_clicks,
+            Link.created_at,
+            Link.expires_at,
+        )
+        .outerjoin(LinkCounter, LinkCounter.link_id == Link.id)
         .filter(Link.user_id == current_user.id)
-        .order_by(Link.created_at.desc())
     )
-    return result.scalars().all()
+    result = await db.execute(paginate(query, Link, page))
+    links = page_items(result.all(), page, response)
+
+    # Include clicks not yet flushed to the database
+    short_codes = [link.short_code for link in links]
+    pending = await get_pending_clicks(redis, short_codes)
+    visitors = await get_unique_visitors(redis, short_codes)
+
+    return [
+        {
+            "short_code": link.short_code,
+            "original_url": link.original_url,
+            "clicks": link.clicks + pending[link.short_code],
+            "unique_visitors": visitors[link.short_code],
+            "created_at": link.created_at,
+            "expires_at": link.expires_at,
+        }
+        for link in links
+    ]
+
+
+@router.get("/top", response_model=list[TopLink])
+async def get_my_top_links(
+    limit: int = Query(10, ge=1, le=100),
+    day: date | None = None,
+    redis: Redis = Depends(get_redis),
+    current_user: User = Depends(require_active_user),
+) -> list[dict]:
+    """
+    Get the current user's most clicked links, from the Redis leaderboard.
+    Pass `day` (UTC) for a single day's clicks instead of lifetime totals.
+    """
+    return await get_top_links(redis, limit, user_id=current_user.id, day=day)
 
 
 @router.delete("/{short_code}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_link(
     short_code: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
+    redis: Redis = Depends(get_redis),
     current_user: User = Depends(require_active_user),
 ) -> None:
     """Delete a link. Users can only delete their own links."""
@@ -100,3 +397,8 @@ async def delete_link(
 
     await db.delete(link)
     await db.commit()
+
+    # Stop serving the link from Redis and every worker's local cache
+    await invalidate_links(redis, [short_code])
+    await remove_from_leaderboards(redis, short_code, link.user_id)
+    await redis.delete(visitors_key(short_code))
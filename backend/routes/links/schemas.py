@@ -1,12 +1,24 @@
-from datetime import datetime
+from datetime import datetime, timezone
 
-from pydantic import BaseModel, ConfigDict, HttpUrl
+from pydantic import AwareDatetime, BaseModel, ConfigDict, HttpUrl, field_validator
 
 
 class LinkCreate(BaseModel):
     """Request schema for creating a new short link."""
 
     url: HttpUrl
+    # Stop redirecting (and delete the link) after this time
+    expires_at: AwareDatetime | None = None
+    # Return the caller's existing link for the same URL instead of a new one.
+    # Links with an expiry are never shared.
+    dedupe: bool = False
+
+    @field_validator("expires_at")
+    @classmethod
+    def check_expires_in_future(cls, value: datetime | None) -> datetime | None:
+        if value is not None and value <= datetime.now(timezone.utc):
+            raise ValueError("expires_at must be in the future")
+        return value
 
 
 class LinkResponse(BaseModel):
@@ -17,4 +29,35 @@ class LinkResponse(BaseModel):
     short_code: str
     original_url: str
     clicks: int
+    # Approximate: counted with a HyperLogLog
+    unique_visitors: int = 0
     created_at: datetime
+    expires_at: datetime | None = None
+
+
+class LinkBulkResult(BaseModel):
+    """Result for one item of a bulk link creation."""
+
+    index: int
+    short_code: str | None = None
+    original_url: str | None = None
+    # True when dedupe returned an existing link
+    existing: bool = False
+    error: str | None = None
+
+
+class LinkBulkResponse(BaseModel):
+    """Response schema for bulk link creation."""
+
+    created: int
+    # Items answered with an existing link (dedupe)
+    existing: int = 0
+    failed: int
+    results: list[LinkBulkResult]
+
+
+class TopLink(BaseModel):
+    """Response schema for a leaderboard entry."""
+
+    short_code: str
+    clicks: int
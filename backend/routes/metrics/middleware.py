@@ -0,0 +1,44 @@
+import time
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from metrics import Histogram
+
+_request_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle HTTP requests, by route template",
+    ("method", "route"),
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Time every HTTP request into http_request_duration_seconds, labelled
+    with the route template (not the path) to keep label values bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # route -> method -> histogram child, so lookups allocate nothing
+        self._children: dict[str, dict[str, object]] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Routing stores the matched route in the shared scope
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            by_method = self._children.get(route)
+            child = by_method.get(method) if by_method is not None else None
+            if child is None:
+                child = _request_seconds.labels(method, route)
+                self._children.setdefault(route, {})[method] = child
+            child.observe(time.perf_counter() - started)
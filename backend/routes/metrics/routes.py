@@ -0,0 +1,35 @@
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+from redis.asyncio import Redis
+
+from redis_client import get_redis
+from routes.metrics.service import collect_metrics
+from settings import METRICS_TOKEN
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(
+    request: Request,
+    redis: Redis = Depends(get_redis),
+) -> PlainTextResponse:
+    """
+    Metrics of all workers in the Prometheus text format.
+    Requires `Authorization: Bearer <METRICS_TOKEN>` when a token is set.
+    """
+    if METRICS_TOKEN and not secrets.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+        )
+
+    return PlainTextResponse(
+        await collect_metrics(redis), media_type=PROMETHEUS_CONTENT_TYPE
+    )
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import socket
+import time
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+import metrics
+from background import BackgroundTask
+from metrics import Histogram
+from redis_client import redis_pool
+from routes.redirect.clicks import (
+    FLUSHED_AT_KEY,
+    FLUSHING_CLICKS_KEY,
+    PENDING_CLICKS_KEY,
+)
+from routes.redirect.events import CLICK_EVENTS_STREAM, CLICK_INGEST_GROUP
+from settings import METRICS_PUBLISH_INTERVAL
+
+# Hash of worker id -> {"published_at", "metrics"} for every live worker
+WORKER_METRICS_KEY = "metrics:workers"
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+# Snapshots older than this belong to workers that have stopped
+WORKER_STALE_AFTER = METRICS_PUBLISH_INTERVAL * 3
+
+LOOP_LAG_PROBE = 0.1  # seconds slept to measure event loop lag
+LOOP_LAG_INTERVAL = 1
+
+_loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop resumes a sleeping task",
+).labels()
+
+
+async def publish_worker_metrics() -> None:
+    """Publish this worker's metrics snapshot to Redis."""
+    value = json.dumps({"published_at": time.time(), "metrics": metrics.snapshot()})
+    async with Redis(connection_pool=redis_pool) as redis:
+        await redis.hset(WORKER_METRICS_KEY, WORKER_ID, value)
+
+
+async def measure_loop_lag() -> None:
+    """Sleep briefly and record how much longer than asked it took."""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await asyncio.sleep(LOOP_LAG_PROBE)
+    _loop_lag_seconds.observe(max(loop.time() - started - LOOP_LAG_PROBE, 0))
+
+
+metrics_publisher = BackgroundTask(
+    "metrics-publisher", publish_worker_metrics, METRICS_PUBLISH_INTERVAL
+)
+loop_lag_monitor = BackgroundTask(
+    "loop-lag-monitor", measure_loop_lag, LOOP_LAG_INTERVAL
+)
+
+
+def _gauge(name: str, help: str, value: float) -> str:
+    return f"# HELP {name} {help}\n# TYPE {name} gauge\n{name} {value}\n"
+
+
+async def _click_events_metrics(redis: Redis, now: float) -> str:
+    """Backlog of the click events stream's ingestion consumer group."""
+    try:
+        groups = await redis.xinfo_groups(CLICK_EVENTS_STREAM)
+    except ResponseError:
+        # No stream yet
+        return ""
+    group = next((g for g in groups if g["name"] == CLICK_INGEST_GROUP), None)
+    if group is None:
+        return ""
+
+    # lag is None when Redis cannot tell, e.g. after entries were trimmed
+    lag = group.get("lag")
+    last_delivered = int(group["last-delivered-id"].split("-", 1)[0]) / 1000
+    behind = now - last_delivered if lag and last_delivered else 0
+    text = _gauge(
+        "click_events_pending",
+        "Click events delivered to the ingester but not yet loaded",
+        group["pending"],
+    )
+    if lag is not None:
+        text += _gauge(
+            "click_events_lag",
+            "Click events not yet delivered to the ingester",
+            lag,
+        )
+    text += _gauge(
+        "click_events_lag_seconds",
+        "Age of the last click event delivered to the ingester, "
+        "while newer ones wait",
+        behind,
+    )
+    return text
+
+
+async def collect_metrics(redis: Redis) -> str:
+    """
+    Render metrics for all live workers in the Prometheus text format,
+    plus click buffer metrics read from Redis. Each worker's counters are
+    a separate series that restarts from zero with the worker, so sum
+    them in PromQL after rate().
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hgetall(WORKER_METRICS_KEY)
+        pipe.get(FLUSHED_AT_KEY)
+        pipe.hlen(PENDING_CLICKS_KEY)
+        pipe.hlen(FLUSHING_CLICKS_KEY)
+        published, flushed_at, pending, flushing = await pipe.execute()
+
+    now = time.time()
+    snapshots = {}
+    stale = []
+    for worker, value in published.items():
+        data = json.loads(value)
+        if now - data["published_at"] > WORKER_STALE_AFTER:
+            stale.append(worker)
+        else:
+            snapshots[worker] = data["metrics"]
+    if stale:
+        await redis.hdel(WORKER_METRICS_KEY, *stale)
+
+    # The serving worker reports live numbers rather than its last snapshot
+    snapshots[WORKER_ID] = metrics.snapshot()
+
+    text = metrics.render(snapshots)
+    if flushed_at is not None:
+        text += _gauge(
+            "click_flush_lag_seconds",
+            "Seconds since buffered clicks were last fully flushed",
+            now - float(flushed_at),
+        )
+    text += _gauge(
+        "clicks_pending_links",
+        "Links with clicks buffered in Redis",
+        pending + flushing,
+    )
+    text += await _click_events_metrics(redis, now)
+    return text
@@ -0,0 +1,66 @@
+import base64
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import Select, tuple_
+
+from settings import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+
+# Response header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """Query parameters for keyset pagination on (created_at, id)."""
+
+    def __init__(
+        self,
+        cursor: str | None = None,
+        limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    """Encode the position after a row as an opaque cursor."""
+    raw = f"{created_at.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Decode a cursor produced by encode_cursor()."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, id = raw.split("|")
+        return datetime.fromisoformat(created_at), UUID(id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def paginate(query: Select, model: type, page: PageParams) -> Select:
+    """
+    Apply newest-first keyset pagination to a query.
+    Fetches one extra row to tell whether another page follows.
+    """
+    if page.cursor:
+        created_at, id = decode_cursor(page.cursor)
+        query = query.filter(
+            tuple_(model.created_at, model.id) < tuple_(created_at, id)
+        )
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(
+        page.limit + 1
+    )
+
+
+def page_items(items: list, page: PageParams, response: Response) -> list:
+    """Trim the extra row from paginate() and set the next cursor header."""
+    if len(items) > page.limit:
+        items = items[: page.limit]
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    return items
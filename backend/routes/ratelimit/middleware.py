@@ -0,0 +1,81 @@
+import json
+
+from redis.asyncio import Redis
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from redis_client import redis_pool
+from routes.auth.service import decode_token
+from routes.ratelimit.service import (
+    TOKEN_BUCKET_SCRIPT,
+    match_limiter,
+    retry_after_header,
+)
+from routes.request_utils import client_ip
+from settings import CLIENT_IP_HEADER
+
+_TOO_MANY_BODY = json.dumps({"detail": "Too many requests"}).encode()
+
+
+def _client_key(scope: Scope) -> str | None:
+    """
+    The signed-in user for requests with a valid bearer token, else the IP.
+    None for anonymous clients without CLIENT_IP_HEADER: behind a proxy the
+    connection address is the proxy's, shared by everyone.
+    """
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                user_id = decode_token(token)
+                if user_id is not None:
+                    return f"user:{user_id}"
+            break
+    if not CLIENT_IP_HEADER:
+        return None
+    return f"ip:{client_ip(scope)}"
+
+
+class RateLimitMiddleware:
+    """
+    Answer rate limited routes with 429 and Retry-After once a client
+    exceeds its limit, before the request does any other work.
+    Other requests pass through.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.redis = Redis(connection_pool=redis_pool)
+        self.script = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = match_limiter(scope["method"], scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        client = _client_key(scope)
+        if client is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = await limiter.acquire(self.redis, self.script, client)
+        if retry_after is None:
+            await self.app(scope, receive, send)
+            return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_TOO_MANY_BODY)).encode()),
+                    (b"retry-after", retry_after_header(retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": _TOO_MANY_BODY})
@@ -0,0 +1,165 @@
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+from redis.exceptions import RedisError
+
+from cache import LocalCache
+from metrics import Counter
+from settings import (
+    RATE_LIMIT_CREATE_BURST,
+    RATE_LIMIT_CREATE_PER_MINUTE,
+    RATE_LIMIT_LEASE,
+    RATE_LIMIT_LEASE_TTL,
+    RATE_LIMIT_LOGIN_BURST,
+    RATE_LIMIT_LOGIN_PER_MINUTE,
+    RATE_LIMIT_REDIRECT_BURST,
+    RATE_LIMIT_REDIRECT_PER_MINUTE,
+)
+
+logger = logging.getLogger(__name__)
+
+LEASE_CACHE_SIZE = 10000  # clients tracked per worker
+
+# Token bucket in a Redis hash of {tokens, updated}, refilled at ARGV[1]
+# tokens per second up to ARGV[2]. Takes up to ARGV[3] tokens and returns
+# {tokens taken, seconds until one is available (as a string)}. Uses the
+# Redis clock so workers with skewed clocks share one timeline.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local wanted = tonumber(ARGV[3])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local state = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+
+local taken = math.min(wanted, math.floor(tokens))
+tokens = tokens - taken
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil(burst / rate) + 1)
+
+local retry_after = 0
+if taken == 0 then
+    retry_after = (1 - tokens) / rate
+end
+return {taken, tostring(retry_after)}
+"""
+
+_decisions = Counter(
+    "rate_limit_decisions_total",
+    "Rate limited requests by outcome: allowed from a local lease, "
+    "allowed after asking Redis, or rejected",
+    ("limit", "decision"),
+)
+
+
+@dataclass(slots=True)
+class _Lease:
+    """Tokens this worker took from a client's bucket, or a rejection."""
+
+    tokens: int
+    retry_at: float | None = None  # monotonic time, set when rejected
+
+
+class RateLimiter:
+    """
+    Token bucket per client, shared by all workers through Redis.
+
+    Workers take tokens from Redis in small leases and spend them locally,
+    so most requests under the limit skip the Redis round trip. Rejections
+    are remembered locally until a token is due. Leased tokens left unspent
+    after RATE_LIMIT_LEASE_TTL are dropped, which only ever makes the limit
+    stricter. If Redis is unavailable, requests are allowed.
+    """
+
+    def __init__(self, name: str, per_minute: float, burst: int):
+        self.name = name
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.lease_size = max(1, min(RATE_LIMIT_LEASE, burst // 10))
+        self._leases = LocalCache(LEASE_CACHE_SIZE, RATE_LIMIT_LEASE_TTL)
+        self._allowed_local = _decisions.labels(name, "local")
+        self._allowed_redis = _decisions.labels(name, "redis")
+        self._rejected = _decisions.labels(name, "rejected")
+
+    async def acquire(
+        self, redis: Redis, script: AsyncScript, client: str
+    ) -> float | None:
+        """
+        Take one token for a client, using TOKEN_BUCKET_SCRIPT registered as script.
+        Returns None if allowed, or the seconds to wait before retrying.
+        """
+        lease = self._leases.get(client)
+        if lease is not None:
+            if lease.retry_at is not None:
+                self._rejected.inc()
+                return max(lease.retry_at - time.monotonic(), 0)
+            if lease.tokens > 0:
+                lease.tokens -= 1
+                self._allowed_local.inc()
+                return None
+
+        try:
+            taken, retry_after = await script(
+                keys=[f"ratelimit:{self.name}:{client}"],
+                args=[self.rate, self.burst, self.lease_size],
+                client=redis,
+            )
+        except RedisError as exc:
+            logger.warning("Rate limiter unavailable, allowing request: %r", exc)
+            return None
+
+        if taken:
+            self._leases.set(client, _Lease(taken - 1))
+            self._allowed_redis.inc()
+            return None
+
+        retry_after = float(retry_after)
+        self._leases.set(
+            client, _Lease(0, time.monotonic() + retry_after), ttl=retry_after
+        )
+        self._rejected.inc()
+        return retry_after
+
+
+def retry_after_header(seconds: float) -> str:
+    """Whole seconds for a Retry-After header, at least 1."""
+    return str(max(1, math.ceil(seconds)))
+
+
+_redirect_limiter = RateLimiter(
+    "redirect", RATE_LIMIT_REDIRECT_PER_MINUTE, RATE_LIMIT_REDIRECT_BURST
+)
+_login_limiter = RateLimiter(
+    "login", RATE_LIMIT_LOGIN_PER_MINUTE, RATE_LIMIT_LOGIN_BURST
+)
+_create_limiter = RateLimiter(
+    "create", RATE_LIMIT_CREATE_PER_MINUTE, RATE_LIMIT_CREATE_BURST
+)
+
+# (methods, path prefixes, limiter), checked in order
+RATE_LIMIT_RULES = [
+    (methods, prefixes, limiter)
+    for methods, prefixes, limiter in [
+        (("GET",), ("/r/", "/redirect/"), _redirect_limiter),
+        (("POST",), ("/redirect/resolve",), _redirect_limiter),
+        (("POST",), ("/auth/login", "/auth/register"), _login_limiter),
+        (("POST",), ("/links/create", "/links/bulk"), _create_limiter),
+    ]
+    if limiter.rate > 0
+]
+
+
+def match_limiter(method: str, path: str) -> RateLimiter | None:
+    """Find the limiter for a request, or None if it is not rate limited."""
+    for methods, prefixes, limiter in RATE_LIMIT_RULES:
+        if method in methods and path.startswith(prefixes):
+            return limiter
+    return None
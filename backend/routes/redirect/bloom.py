@@ -0,0 +1,142 @@
+import hashlib
+import logging
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import LockError
+from sqlalchemy.future import select
+
+from background import BackgroundTask
+from database import AsyncSessionLocal
+from models import Link
+from redis_client import redis_pool
+from settings import LINK_BLOOM_BITS, LINK_BLOOM_HASHES, LINK_BLOOM_REBUILD_HOURS
+
+logger = logging.getLogger(__name__)
+
+# Bloom filter over every existing short code, stored as a Redis bitmap.
+# Bits are only ever set, so deleted codes remain as false positives until
+# the periodic rebuild replaces the bitmap.
+# The key includes the filter shape so resizing starts a fresh filter.
+BLOOM_KEY = f"links:bloom:{LINK_BLOOM_BITS}:{LINK_BLOOM_HASHES}"
+# Next bitmap, built from the database and then renamed over BLOOM_KEY.
+# New codes are added to both, so none is missed whenever the swap happens.
+BLOOM_BUILD_KEY = f"{BLOOM_KEY}:building"
+# Set once the bitmap holds every code in the database; until then
+# lookups must not trust the filter
+BLOOM_READY_KEY = f"{BLOOM_KEY}:ready"
+# Present while the bitmap is younger than LINK_BLOOM_REBUILD_HOURS
+BLOOM_FRESH_KEY = f"{BLOOM_KEY}:fresh"
+BLOOM_LOCK_KEY = f"{BLOOM_KEY}:lock"
+BLOOM_LOCK_TIMEOUT = 300  # seconds
+BLOOM_REBUILD_BATCH_SIZE = 5000
+BLOOM_CHECK_INTERVAL = 60  # seconds
+
+
+def bloom_offsets(short_code: str) -> list[int]:
+    """Bit offsets for a short code (double hashing over one digest)."""
+    digest = hashlib.blake2b(short_code.encode(), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % LINK_BLOOM_BITS for i in range(LINK_BLOOM_HASHES)]
+
+
+def queue_bloom_add(pipe: Pipeline, short_code: str) -> None:
+    """Queue the bits for a short code on a pipeline."""
+    for offset in bloom_offsets(short_code):
+        # Next bitmap first: if it replaces the current one in between,
+        # the bit is still in whichever bitmap lookups read
+        pipe.setbit(BLOOM_BUILD_KEY, offset, 1)
+        pipe.setbit(BLOOM_KEY, offset, 1)
+
+
+def queue_bloom_check(pipe: Pipeline, short_code: str) -> None:
+    """
+    Queue a membership check on a pipeline. Adds one result for the ready
+    flag followed by one per bit; pass them to bloom_might_contain().
+    """
+    pipe.exists(BLOOM_READY_KEY)
+    for offset in bloom_offsets(short_code):
+        pipe.getbit(BLOOM_KEY, offset)
+
+
+def bloom_might_contain(results: list) -> bool:
+    """
+    Interpret results queued by queue_bloom_check().
+    False means the code definitely does not exist.
+    """
+    ready, *bits = results
+    return not ready or all(bits)
+
+
+async def add_to_bloom(redis: Redis, short_codes: list[str]) -> None:
+    """Add short codes to the filter."""
+    async with redis.pipeline(transaction=False) as pipe:
+        for short_code in short_codes:
+            queue_bloom_add(pipe, short_code)
+        await pipe.execute()
+
+
+async def rebuild_bloom(redis: Redis) -> bool:
+    """
+    Rebuild the filter from the links table if it is not ready yet (first
+    start, or Redis lost its data) or older than LINK_BLOOM_REBUILD_HOURS,
+    dropping the bits of codes deleted since.
+
+    Codes are added to the next bitmap, which already receives every new
+    code, then it replaces the current one atomically, so links created
+    during the rebuild are never missed. Returns True if a rebuild ran.
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.exists(BLOOM_READY_KEY)
+        pipe.exists(BLOOM_FRESH_KEY)
+        ready, fresh = await pipe.execute()
+    if ready and fresh:
+        return False
+
+    lock = redis.lock(BLOOM_LOCK_KEY, timeout=BLOOM_LOCK_TIMEOUT, blocking=False)
+    if not await lock.acquire():
+        # Another worker is rebuilding
+        return False
+
+    try:
+        count = 0
+        async with AsyncSessionLocal() as db:
+            result = await db.stream_scalars(
+                select(Link.short_code).execution_options(
+                    yield_per=BLOOM_REBUILD_BATCH_SIZE
+                )
+            )
+            async for short_codes in result.partitions():
+                async with redis.pipeline(transaction=False) as pipe:
+                    for short_code in short_codes:
+                        for offset in bloom_offsets(short_code):
+                            pipe.setbit(BLOOM_BUILD_KEY, offset, 1)
+                    await pipe.execute()
+                count += len(short_codes)
+
+        # Empty unless a code was added, so there is always a key to rename
+        await redis.set(BLOOM_BUILD_KEY, "", nx=True)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.rename(BLOOM_BUILD_KEY, BLOOM_KEY)
+            pipe.set(BLOOM_READY_KEY, 1)
+            pipe.set(
+                BLOOM_FRESH_KEY, 1, ex=max(1, int(LINK_BLOOM_REBUILD_HOURS * 3600))
+            )
+            await pipe.execute()
+        logger.info("Rebuilt short code filter with %d codes", count)
+        return True
+    finally:
+        try:
+            await lock.release()
+        except LockError:
+            logger.warning("Filter rebuild lock expired before release")
+
+
+async def ensure_bloom() -> None:
+    """Rebuild the filter if needed using a connection from the shared pool."""
+    async with Redis(connection_pool=redis_pool) as redis:
+        await rebuild_bloom(redis)
+
+
+bloom_builder = BackgroundTask("bloom-builder", ensure_bloom, BLOOM_CHECK_INTERVAL)
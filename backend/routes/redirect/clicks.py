@@ -0,0 +1,149 @@
+import logging
+import time
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import LockError, ResponseError
+from sqlalchemy import Integer, String, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from background import BackgroundTask
+from database import AsyncSessionLocal
+from metrics import Histogram
+from redis_client import redis_pool
+from settings import CLICK_FLUSH_BATCH_SIZE, CLICK_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Hash of short_code -> clicks not yet written to Postgres
+PENDING_CLICKS_KEY = "clicks:pending"
+# Snapshot of the pending hash taken by the flusher; survives crashes mid-flush
+FLUSHING_CLICKS_KEY = "clicks:flushing"
+FLUSH_LOCK_KEY = "clicks:flush:lock"
+FLUSH_LOCK_TIMEOUT = 60  # seconds
+# Unix time of the last flush that emptied the buffer
+FLUSHED_AT_KEY = "clicks:flushed_at"
+
+_flush_seconds = Histogram(
+    "click_flush_seconds",
+    "Duration of click flushes that wrote to the database",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0),
+).labels()
+
+# Add one batch of deltas to link_counters with a single statement, locking
+# counter rows in link order so concurrent batches cannot deadlock.
+# Codes must be distinct.
+FLUSH_CLICKS_SQL = text(
+    """
+    INSERT INTO link_counters (link_id, clicks)
+    SELECT links.id, pending.delta
+    FROM unnest(:codes, :deltas) AS pending(short_code, delta)
+    JOIN links ON links.short_code = pending.short_code
+    ORDER BY links.id
+    ON CONFLICT (link_id)
+    DO UPDATE SET clicks = link_counters.clicks + excluded.clicks
+    """
+).bindparams(
+    bindparam("codes", type_=ARRAY(String)),
+    bindparam("deltas", type_=ARRAY(Integer)),
+)
+
+
+def queue_click(pipe: Pipeline, short_code: str) -> None:
+    """Queue buffering a click in Redis until the next flush."""
+    pipe.hincrby(PENDING_CLICKS_KEY, short_code, 1)
+
+
+async def get_pending_clicks(redis: Redis, short_codes: list[str]) -> dict[str, int]:
+    """
+    Get clicks buffered in Redis but not yet flushed to Postgres.
+    Add these to link_counters.clicks to get an up-to-date count.
+    """
+    if not short_codes:
+        return {}
+
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hmget(PENDING_CLICKS_KEY, short_codes)
+        pipe.hmget(FLUSHING_CLICKS_KEY, short_codes)
+        pending, flushing = await pipe.execute()
+
+    return {
+        code: int(pending_count or 0) + int(flushing_count or 0)
+        for code, pending_count, flushing_count in zip(short_codes, pending, flushing)
+    }
+
+
+async def flush_clicks(redis: Redis, batch_size: int = CLICK_FLUSH_BATCH_SIZE) -> int:
+    """
+    Merge buffered clicks into link_counters.
+
+    The pending hash is renamed to a flushing snapshot, which is then applied
+    batch by batch; each batch is removed from the snapshot only after its
+    transaction commits. A crash mid-flush leaves the snapshot in place to be
+    retried by the next flush, so clicks are never lost (a batch may be
+    applied twice if the process dies between commit and removal).
+
+    Returns the number of clicks flushed.
+    """
+    lock = redis.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TIMEOUT, blocking=False)
+    if not await lock.acquire():
+        # Another worker is flushing
+        return 0
+
+    try:
+        started = time.perf_counter()
+        if not await redis.exists(FLUSHING_CLICKS_KEY):
+            try:
+                await redis.rename(PENDING_CLICKS_KEY, FLUSHING_CLICKS_KEY)
+            except ResponseError:
+                # Nothing pending
+                await redis.set(FLUSHED_AT_KEY, time.time())
+                return 0
+
+        flushed = 0
+        async with AsyncSessionLocal() as db:
+            # Nothing else writes to the snapshot, so a full cursor pass sees
+            # every code. Pages may be empty, or (for small hashes) hold more
+            # than batch_size codes, so only cursor 0 marks the end.
+            cursor = 0
+            while True:
+                cursor, page = await redis.hscan(
+                    FLUSHING_CLICKS_KEY, cursor, count=batch_size
+                )
+                items = list(page.items())
+                for start in range(0, len(items), batch_size):
+                    batch = items[start : start + batch_size]
+                    codes = [code for code, _ in batch]
+                    deltas = [int(delta) for _, delta in batch]
+
+                    await db.execute(
+                        FLUSH_CLICKS_SQL, {"codes": codes, "deltas": deltas}
+                    )
+                    await db.commit()
+                    await redis.hdel(FLUSHING_CLICKS_KEY, *codes)
+
+                    flushed += sum(deltas)
+                    await lock.reacquire()
+                if cursor == 0:
+                    break
+
+        # Only recorded once the snapshot is drained
+        await redis.set(FLUSHED_AT_KEY, time.time())
+        _flush_seconds.observe(time.perf_counter() - started)
+        return flushed
+    finally:
+        try:
+            await lock.release()
+        except LockError:
+            logger.warning("Click flush lock expired before release")
+
+
+async def flush_pending_clicks() -> int:
+    """Flush buffered clicks using a connection from the shared pool."""
+    async with Redis(connection_pool=redis_pool) as redis:
+        return await flush_clicks(redis)
+
+
+click_flusher = BackgroundTask(
+    "click-flusher", flush_pending_clicks, CLICK_FLUSH_INTERVAL
+)
@@ -0,0 +1,78 @@
+import hashlib
+from dataclasses import dataclass
+
+from redis.asyncio.client import Pipeline
+from starlette.datastructures import Headers
+from starlette.types import Scope
+
+from metrics import Counter, Histogram
+from routes.request_utils import client_ip
+from settings import (
+    CLICK_EVENTS_COUNTRY_HEADER,
+    CLICK_EVENTS_MAXLEN,
+    UNIQUE_VISITORS_ENABLED,
+)
+
+# Stream of click events: c=short code, r=referrer, u=user agent, g=country.
+# The click time is the millisecond timestamp in the entry id.
+CLICK_EVENTS_STREAM = "clicks:events"
+# Consumer group of management/commands/ingest_clicks.py
+CLICK_INGEST_GROUP = "click-ingest"
+
+FIELD_MAX_LENGTH = 512  # characters kept of the referrer and user agent
+
+# Updated by the ingester. Declared here so that API workers, which render
+# /metrics, know them too; /metrics only renders metrics registered locally.
+click_events_ingested = Counter(
+    "click_events_ingested_total", "Click events loaded into Postgres"
+).labels()
+click_ingest_batch_seconds = Histogram(
+    "click_ingest_batch_seconds",
+    "Time to load one batch of click events and ack it",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+).labels()
+
+
+@dataclass(frozen=True, slots=True)
+class ClickDetails:
+    """Who followed a link, from the redirect request's headers."""
+
+    referrer: str | None = None
+    user_agent: str | None = None
+    country: str | None = None
+    # Hash of the client IP and user agent, counted in unique visitors
+    visitor: str | None = None
+
+    @classmethod
+    def from_scope(cls, scope: Scope) -> "ClickDetails":
+        headers = Headers(scope=scope)
+        country = headers.get(CLICK_EVENTS_COUNTRY_HEADER)
+        user_agent = headers.get("user-agent")
+        return cls(
+            referrer=headers.get("referer"),
+            user_agent=user_agent,
+            country=country.upper() if country and len(country) == 2 else None,
+            visitor=(
+                visitor_fingerprint(client_ip(scope), user_agent)
+                if UNIQUE_VISITORS_ENABLED
+                else None
+            ),
+        )
+
+
+def visitor_fingerprint(client_ip: str, user_agent: str | None) -> str:
+    """Short hash identifying a visitor without storing their IP."""
+    raw = f"{client_ip}|{user_agent or ''}".encode()
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+
+def queue_click_event(pipe: Pipeline, short_code: str, details: ClickDetails) -> None:
+    """Queue appending a click event to the stream on a pipeline."""
+    fields = {"c": short_code}
+    if details.referrer:
+        fields["r"] = details.referrer[:FIELD_MAX_LENGTH]
+    if details.user_agent:
+        fields["u"] = details.user_agent[:FIELD_MAX_LENGTH]
+    if details.country:
+        fields["g"] = details.country
+    pipe.xadd(CLICK_EVENTS_STREAM, fields, maxlen=CLICK_EVENTS_MAXLEN, approximate=True)
@@ -0,0 +1,81 @@
+import json
+from types import SimpleNamespace
+from urllib.parse import quote
+
+from redis.asyncio import Redis
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from redis_client import redis_pool
+from routes.redirect.events import ClickDetails
+from routes.redirect.service import LinkService
+
+FAST_REDIRECT_PREFIX = "/r/"
+# Stands in for a router match, so outer middleware can label the request
+FAST_REDIRECT_ROUTE = SimpleNamespace(path=FAST_REDIRECT_PREFIX + "{short_code}")
+
+# Characters left as they are when escaping a URL for the Location header
+_LOCATION_SAFE = ":/?#[]@!$&'()*+,;=%~"
+
+_NOT_FOUND_BODY = json.dumps({"detail": "Link not found"}).encode()
+_NOT_FOUND_HEADERS = [
+    (b"content-type", b"application/json"),
+    (b"content-length", str(len(_NOT_FOUND_BODY)).encode()),
+]
+# Redirects must reach the server every time, or clicks would go uncounted
+_REDIRECT_HEADERS = [
+    (b"content-length", b"0"),
+    (b"cache-control", b"private, no-store"),
+]
+
+
+def _location(url: str) -> bytes:
+    """Encode a URL as a Location header value."""
+    if not (url.isascii() and url.isprintable()):
+        url = quote(url, safe=_LOCATION_SAFE)
+    return url.encode("ascii")
+
+
+class FastRedirectMiddleware:
+    """
+    Answer GET /r/{short_code} with a 302 before the request reaches FastAPI.
+
+    Skips routing, dependency injection and response serialization, and
+    shares one Redis client between requests. A database session is opened
+    only when the link misses every cache. Other requests pass through.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.redis = Redis(connection_pool=redis_pool)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get("path", "") if scope["type"] == "http" else ""
+        if scope.get("method") != "GET" or not path.startswith(FAST_REDIRECT_PREFIX):
+            await self.app(scope, receive, send)
+            return
+
+        scope["route"] = FAST_REDIRECT_ROUTE
+        short_code = path[len(FAST_REDIRECT_PREFIX) :]
+        url = await LinkService(self.redis).get_original_url(
+            short_code, ClickDetails.from_scope(scope)
+        )
+
+        if url is None:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 404,
+                    "headers": _NOT_FOUND_HEADERS,
+                }
+            )
+            await send({"type": "http.response.body", "body": _NOT_FOUND_BODY})
+            return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 302,
+                "headers": [(b"location", _location(url)), *_REDIRECT_HEADERS],
+            }
+        )
+        await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,64 @@
+from datetime import date, datetime, timezone
+from uuid import UUID
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from settings import LEADERBOARD_DAILY, LEADERBOARD_DAY_RETENTION
+
+# Sorted sets of short_code -> clicks. Lifetime sets can be rebuilt from
+# link_counters (see management/commands/rebuild_leaderboards.py); daily
+# sets only exist in Redis and expire after LEADERBOARD_DAY_RETENTION days.
+GLOBAL_LEADERBOARD_KEY = "top:links"
+
+
+def leaderboard_key(user_id: UUID | str | None = None, day: date | None = None) -> str:
+    """Key of the global or per-user leaderboard, optionally for one day."""
+    key = GLOBAL_LEADERBOARD_KEY if user_id is None else f"top:user:{user_id}"
+    return key if day is None else f"{key}:{day.isoformat()}"
+
+
+def queue_leaderboard_click(
+    pipe: Pipeline, short_code: str, user_id: str | None
+) -> None:
+    """Queue leaderboard updates for one click on a pipeline."""
+    owners = [None] if user_id is None else [None, user_id]
+    today = datetime.now(timezone.utc).date() if LEADERBOARD_DAILY else None
+
+    for owner in owners:
+        pipe.zincrby(leaderboard_key(owner), 1, short_code)
+        if today is not None:
+            day_key = leaderboard_key(owner, today)
+            pipe.zincrby(day_key, 1, short_code)
+            pipe.expire(day_key, LEADERBOARD_DAY_RETENTION * 86400, nx=True)
+
+
+async def get_top_links(
+    redis: Redis,
+    limit: int,
+    user_id: UUID | None = None,
+    day: date | None = None,
+) -> list[dict]:
+    """Get the most clicked links, highest first."""
+    top = await redis.zrevrange(
+        leaderboard_key(user_id, day), 0, limit - 1, withscores=True
+    )
+    return [{"short_code": code, "clicks": int(score)} for code, score in top]
+
+
+def queue_leaderboard_removal(
+    pipe: Pipeline, short_code: str, user_id: UUID | None
+) -> None:
+    """Queue removing a deleted link from the lifetime leaderboards on a pipeline."""
+    pipe.zrem(leaderboard_key(), short_code)
+    if user_id is not None:
+        pipe.zrem(leaderboard_key(user_id), short_code)
+
+
+async def remove_from_leaderboards(
+    redis: Redis, short_code: str, user_id: UUID | None
+) -> None:
+    """Remove a deleted link from the lifetime leaderboards."""
+    async with redis.pipeline(transaction=False) as pipe:
+        queue_leaderboard_removal(pipe, short_code, user_id)
+        await pipe.execute()
@@ -0,0 +1,89 @@
+import logging
+
+from redis.asyncio import Redis
+from redis.exceptions import LockError
+from sqlalchemy import text
+
+from background import BackgroundTask
+from database import AsyncSessionLocal
+from metrics import Counter
+from redis_client import redis_pool
+from routes.redirect.leaderboard import queue_leaderboard_removal
+from routes.redirect.service import invalidate_links
+from routes.redirect.visitors import visitors_key
+from settings import LINK_REAP_BATCH_SIZE, LINK_REAP_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+REAP_LOCK_KEY = "links:reap:lock"
+REAP_LOCK_TIMEOUT = 60  # seconds
+
+# Delete one batch of expired links; counters and rollups cascade
+REAP_EXPIRED_SQL = text(
+    """
+    DELETE FROM links
+    WHERE id IN (
+        SELECT id FROM links
+        WHERE expires_at <= now()
+        ORDER BY expires_at
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING short_code, user_id
+    """
+)
+
+_reaped = Counter("links_reaped_total", "Expired links deleted by the reaper").labels()
+
+
+async def reap_expired_links(batch_size: int = LINK_REAP_BATCH_SIZE) -> int:
+    """
+    Delete expired links batch by batch, each in its own transaction, and
+    evict them from the caches, leaderboards and visitor counts. Redirects
+    already refuse expired links from the cached expires_at, so eviction
+    only frees memory.
+
+    Returns the number of links deleted.
+    """
+    async with Redis(connection_pool=redis_pool) as redis:
+        lock = redis.lock(REAP_LOCK_KEY, timeout=REAP_LOCK_TIMEOUT, blocking=False)
+        if not await lock.acquire():
+            # Another worker is reaping
+            return 0
+
+        reaped = 0
+        try:
+            async with AsyncSessionLocal() as db:
+                while True:
+                    result = await db.execute(
+                        REAP_EXPIRED_SQL, {"batch_size": batch_size}
+                    )
+                    rows = result.all()
+                    await db.commit()
+                    if not rows:
+                        break
+
+                    await invalidate_links(redis, [row.short_code for row in rows])
+                    async with redis.pipeline(transaction=False) as pipe:
+                        for row in rows:
+                            queue_leaderboard_removal(pipe, row.short_code, row.user_id)
+                            pipe.delete(visitors_key(row.short_code))
+                        await pipe.execute()
+
+                    reaped += len(rows)
+                    _reaped.inc(len(rows))
+                    if len(rows) < batch_size:
+                        break
+                    await lock.reacquire()
+        finally:
+            try:
+                await lock.release()
+            except LockError:
+                logger.warning("Link reaper lock expired before release")
+
+    if reaped:
+        logger.info("Deleted %d expired links", reaped)
+    return reaped
+
+
+link_reaper = BackgroundTask("link-reaper", reap_expired_links, LINK_REAP_INTERVAL)
@@ -1,24 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from redis.asyncio import Redis
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
 from redis_client import get_redis
-from routes.redirect.schemas import RedirectResponse
+from routes.redirect.events import ClickDetails
+from routes.redirect.schemas import RedirectResponse, ResolveRequest, ResolveResponse
 from routes.redirect.service import LinkService
 
 router = APIRouter(tags=["redirect"])
 
 
+@router.post("/redirect/resolve", response_model=ResolveResponse)
+async def resolve_short_codes(
+    request: ResolveRequest,
+    redis: Redis = Depends(get_redis),
+) -> ResolveResponse:
+    """
+    Resolve many short codes to their original URLs in one request.
+    Clicks are only counted when count_clicks is true.
+    """
+    service = LinkService(redis)
+    urls = await service.resolve_many(request.codes, request.count_clicks)
+    return ResolveResponse(urls=urls)
+
+
 @router.get("/redirect/{short_code}", response_model=RedirectResponse)
 async def get_original_url(
     short_code: str,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
     redis: Redis = Depends(get_redis),
 ) -> RedirectResponse:
-    """Get the original URL for a short code and increment click count."""
-    service = LinkService(db, redis)
-    url = await service.get_original_url(short_code)
+    """
+    Get the original URL for a short code and increment click count.
+    Browsers can use the faster GET /r/{short_code}, which answers with a 302.
+    """
+    service = LinkService(redis)
+    url = await service.get_original_url(
+        short_code, ClickDetails.from_scope(request.scope)
+    )
 
     if not url:
         raise HTTPException(status_code=404, detail="Link not found")
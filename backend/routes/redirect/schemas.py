@@ -1,7 +1,23 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+# Most short codes accepted by one resolve request
+RESOLVE_MAX_CODES = 1000
 
 
 class RedirectResponse(BaseModel):
     """Response schema for redirect endpoint."""
 
     url: str
+
+
+class ResolveRequest(BaseModel):
+    """Request schema for resolving many short codes at once."""
+
+    codes: list[str] = Field(min_length=1, max_length=RESOLVE_MAX_CODES)
+    count_clicks: bool = False
+
+
+class ResolveResponse(BaseModel):
+    """Response schema mapping each short code to its URL (null if not found)."""
+
+    urls: dict[str, str | None]
@@ -1,59 +1,496 @@
+import asyncio
+import json
+import math
+import time
+from dataclasses import dataclass
+from functools import partial
+
 from redis.asyncio import Redis
-from sqlalchemy import update
-from sqlalchemy.ext.asyncio import AsyncSession
+from redis.exceptions import LockError
+from sqlalchemy import String, any_, bindparam, func, or_
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.future import select
 
+from cache import TOMBSTONE, LocalCache, invalidate_many, register_local_cache
+from database import AsyncSessionLocal, read_sessionmaker
+from metrics import Counter
 from models import Link
+from redis_client import redis_pool
+from routes.analytics.service import queue_bucket_click
+from routes.redirect.bloom import bloom_might_contain, queue_bloom_check
+from routes.redirect.clicks import FLUSH_CLICKS_SQL, queue_click
+from routes.redirect.events import ClickDetails, queue_click_event
+from routes.redirect.leaderboard import queue_leaderboard_click
+from routes.redirect.visitors import queue_visit
+from settings import (
+    CLICK_COUNTER_MODE,
+    CLICK_EVENTS_ENABLED,
+    LINK_CACHE_SIZE,
+    LINK_CACHE_TTL,
+    LINK_FILL_LOCK_TTL,
+    LINK_FILL_WAIT,
+    LINK_NEGATIVE_CACHE_TTL,
+)
+from short_codes import is_valid_short_code
 
 REDIS_CACHE_TTL = 86400  # 1 day in seconds
+# Seconds a deleted link's Redis key holds a tombstone; outlasts any fill's
+# database lookup, which writes with SET NX so it cannot revive the link
+LINK_TOMBSTONE_TTL = 60
+FILL_POLL_INTERVAL = 0.01  # seconds between checks while another worker fills
+
+
+@dataclass(frozen=True, slots=True)
+class CachedLink:
+    """What the redirect path needs to know about a link, as cached in Redis."""
+
+    url: str
+    user_id: str | None = None
+    expires_at: float | None = None  # Unix time
+
+    @classmethod
+    def from_link(cls, link: Link) -> "CachedLink":
+        """Build from a Link, or any row with original_url, user_id and expires_at."""
+        return cls(
+            url=link.original_url,
+            user_id=str(link.user_id) if link.user_id else None,
+            expires_at=link.expires_at.timestamp() if link.expires_at else None,
+        )
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and self.expires_at <= time.time()
+
+    def cache_ttl(self) -> int:
+        """Seconds to keep in Redis: REDIS_CACHE_TTL, or less if it expires sooner."""
+        if self.expires_at is None:
+            return REDIS_CACHE_TTL
+        return max(1, min(REDIS_CACHE_TTL, math.ceil(self.expires_at - time.time())))
+
+    def dumps(self) -> str:
+        return json.dumps(
+            {"url": self.url, "user_id": self.user_id, "expires_at": self.expires_at}
+        )
+
+    @classmethod
+    def loads(cls, value: str) -> "CachedLink | None":
+        """Parse a cached value; None for entries in an outdated format."""
+        if not value.startswith("{"):
+            return None
+        return cls(**json.loads(value))
+
+
+# Per-worker cache of link:{short_code} -> CachedLink, kept coherent
+# across workers through cache.invalidate()
+link_cache = LocalCache(LINK_CACHE_SIZE, LINK_CACHE_TTL)
+register_local_cache("link", link_cache)
+
+
+_lookups = Counter(
+    "link_lookups_total", "Short code lookups by where they were answered", ("result",)
+)
+_lookup_invalid = _lookups.labels("invalid")
+_lookup_local_hit = _lookups.labels("local_hit")
+_lookup_redis_hit = _lookups.labels("redis_hit")
+_lookup_rejected = _lookups.labels("rejected")  # negative cache or Bloom filter
+_lookup_db_hit = _lookups.labels("db_hit")
+_lookup_db_miss = _lookups.labels("db_miss")
+_lookup_expired = _lookups.labels("expired")  # found but past expires_at
+
+_coalesced = Counter(
+    "link_misses_coalesced_total",
+    "Cache misses answered by another request's database lookup",
+    ("scope",),
+)
+_coalesced_worker = _coalesced.labels("worker")
+_coalesced_cluster = _coalesced.labels("cluster")
+_fill_wait_timeouts = Counter(
+    "link_fill_wait_timeouts_total",
+    "Cache misses that gave up waiting for another worker's lookup",
+).labels()
+
+
+def link_cache_key(short_code: str) -> str:
+    """Redis key caching a short code's CachedLink."""
+    return f"link:{short_code}"
+
+
+def missing_cache_key(short_code: str) -> str:
+    """Redis key marking a short code that was not found in the database."""
+    return f"missing:{short_code}"
+
+
+def fill_lock_key(short_code: str) -> str:
+    """Redis lock held by the worker loading a short code from the database."""
+    return f"fill:{short_code}"
+
+
+async def invalidate_links(redis: Redis, short_codes: list[str]) -> None:
+    """Stop serving deleted links from Redis and every worker's local cache."""
+    await invalidate_many(
+        redis,
+        [link_cache_key(short_code) for short_code in short_codes],
+        tombstone_ttl=LINK_TOMBSTONE_TTL,
+    )
+
+
+def not_expired():
+    """Filter for links that have no expiry or have not reached it."""
+    return or_(Link.expires_at.is_(None), Link.expires_at > func.now())
+
+
+async def _wait_for_fill(
+    redis: Redis, short_code: str
+) -> tuple[bool, CachedLink | None]:
+    """
+    Wait up to LINK_FILL_WAIT for another worker to cache a short code.
+    Returns (filled, link); link is None if the code was found missing.
+    """
+    cache_key = link_cache_key(short_code)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LINK_FILL_WAIT
+    while loop.time() < deadline:
+        await asyncio.sleep(FILL_POLL_INTERVAL)
+        generation = link_cache.generation(cache_key)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.get(cache_key)
+            pipe.exists(missing_cache_key(short_code))
+            cached_value, is_missing = await pipe.execute()
+
+        if cached_value == TOMBSTONE or is_missing:
+            return True, None
+        cached = CachedLink.loads(cached_value) if cached_value else None
+        if cached is not None:
+            link_cache.set(cache_key, cached, generation=generation)
+            return True, cached
+    return False, None
+
+
+async def _fill_from_database(short_code: str) -> CachedLink | None:
+    """
+    Load a short code from the database into Redis and the local cache.
+    A short Redis lock lets one worker query while the others wait for
+    its result; they query themselves only if it takes too long.
+    Links past their expiry are cached as missing.
+    Uses its own connections, as it may outlive the request that started it.
+    """
+    cache_key = link_cache_key(short_code)
+    # Read before the lookup, so a link deleted meanwhile is not cached locally
+    generation = link_cache.generation(cache_key)
+    async with Redis(connection_pool=redis_pool) as redis:
+        lock = redis.lock(
+            fill_lock_key(short_code), timeout=LINK_FILL_LOCK_TTL, blocking=False
+        )
+        if not await lock.acquire():
+            filled, cached = await _wait_for_fill(redis, short_code)
+            if filled:
+                _coalesced_cluster.inc()
+                return cached
+            _fill_wait_timeouts.inc()
+            lock = None
+
+        try:
+            query = select(Link.original_url, Link.user_id, Link.expires_at).where(
+                Link.short_code == short_code, not_expired()
+            )
+            session_factory = read_sessionmaker()
+            async with session_factory() as db:
+                link = (await db.execute(query)).first()
+            if link is None and session_factory is not AsyncSessionLocal:
+                # The link may be too new to have reached the replica
+                async with AsyncSessionLocal() as db:
+                    link = (await db.execute(query)).first()
+
+            if link is None:
+                _lookup_db_miss.inc()
+                await redis.set(
+                    missing_cache_key(short_code), 1, ex=LINK_NEGATIVE_CACHE_TTL
+                )
+                return None
+
+            _lookup_db_hit.inc()
+            cached = CachedLink.from_link(link)
+            # NX: never overwrite a tombstone left by a delete during the lookup
+            if await redis.set(
+                cache_key, cached.dumps(), ex=cached.cache_ttl(), nx=True
+            ):
+                link_cache.set(cache_key, cached, generation=generation)
+            return cached
+        finally:
+            if lock is not None:
+                try:
+                    await lock.release()
+                except LockError:
+                    # Expired while querying; another worker may have taken over
+                    pass
+
+
+# Database lookups in progress in this worker, by short code
+_fills: dict[str, asyncio.Task] = {}
+
+
+def _fill_done(short_code: str, task: asyncio.Task) -> None:
+    if _fills.get(short_code) is task:
+        del _fills[short_code]
+    if not task.cancelled():
+        task.exception()  # Retrieved even if every waiter went away
+
+
+async def fill_link(short_code: str) -> CachedLink | None:
+    """
+    Load a short code that missed the caches, sharing one database
+    lookup between all concurrent misses for it in this worker.
+    """
+    task = _fills.get(short_code)
+    if task is None:
+        task = asyncio.create_task(_fill_from_database(short_code))
+        task.add_done_callback(partial(_fill_done, short_code))
+        _fills[short_code] = task
+    else:
+        _coalesced_worker.inc()
+
+    # Shielded so one cancelled request does not cancel the others
+    return await asyncio.shield(task)
+
+
+def _short_codes_param(short_codes: list[str]):
+    """
+    Bind short codes as one array parameter, for `= ANY(...)`, so the
+    statement is the same (and prepared once) for any number of codes.
+    """
+    return bindparam("short_codes", short_codes, type_=ARRAY(String))
 
 
 class LinkService:
-    """Service for link-related operations."""
+    """
+    Service for link-related operations.
+    Database sessions are opened only when a lookup misses every cache.
+    """
 
-    def __init__(self, db: AsyncSession, redis: Redis):
-        self.db = db
+    def __init__(self, redis: Redis):
         self.redis = redis
 
-    async def get_original_url(self, short_code: str) -> str | None:
+    async def get_original_url(
+        self, short_code: str, details: ClickDetails | None = None
+    ) -> str | None:
         """
         Get the original URL for a short code.
-        Checks Redis cache first, falls back to database.
-        Increments click count on each access.
+        Links past their expires_at are treated as not found, checked
+        against the cached value so expiry costs no extra lookup.
+        Checks the in-process cache, then Redis, then falls back to database.
+        Concurrent misses for the same code share one database lookup.
+        Unknown codes are rejected by the Bloom filter or the negative
+        cache without querying the database.
+        Records a click on each access, either buffered in Redis
+        (write-behind) or written straight to the database, and a click
+        event with the request's details if given.
 
         Returns None if link not found.
         """
-        cache_key = f"link:{short_code}"
+        if not is_valid_short_code(short_code):
+            _lookup_invalid.inc()
+            return None
 
-        # Check Redis cache first
-        cached_url = await self.redis.get(cache_key)
-        if cached_url:
-            await self._increment_clicks(short_code)
-            return cached_url
+        cache_key = link_cache_key(short_code)
 
-        # Check database
-        result = await self.db.execute(
-            select(Link).filter(Link.short_code == short_code)
-        )
-        link = result.scalar_one_or_none()
+        # Check in-process cache
+        cached = link_cache.get(cache_key)
+        if cached is not None:
+            _lookup_local_hit.inc()
+            return await self._follow(short_code, cached, details)
 
-        if not link:
+        # Check Redis cache, negative cache and Bloom filter in one round trip.
+        # The generation keeps a link deleted meanwhile out of the local cache.
+        generation = link_cache.generation(cache_key)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(cache_key)
+            pipe.exists(missing_cache_key(short_code))
+            queue_bloom_check(pipe, short_code)
+            cached_value, is_missing, *bloom_results = await pipe.execute()
+
+        cached = CachedLink.loads(cached_value) if cached_value else None
+        if cached is not None:
+            _lookup_redis_hit.inc()
+            link_cache.set(cache_key, cached, generation=generation)
+            return await self._follow(short_code, cached, details)
+
+        if (
+            cached_value == TOMBSTONE
+            or is_missing
+            or not bloom_might_contain(bloom_results)
+        ):
+            _lookup_rejected.inc()
             return None
 
-        # Cache in Redis
-        await self.redis.set(cache_key, link.original_url, ex=REDIS_CACHE_TTL)
+        # Check database, once for all concurrent misses, and cache the result
+        cached = await fill_link(short_code)
+        if cached is None:
+            return None
 
-        # Increment clicks
-        link.clicks += 1
-        await self.db.commit()
+        return await self._follow(short_code, cached, details)
 
-        return link.original_url
+    async def _follow(
+        self, short_code: str, cached: CachedLink, details: ClickDetails | None
+    ) -> str | None:
+        """Record a click on a link and return its URL, unless it has expired."""
+        if cached.expired:
+            # Cached before it expired; the reaper evicts it from the caches
+            _lookup_expired.inc()
+            return None
 
-    async def _increment_clicks(self, short_code: str) -> None:
-        """Increment click count for a link."""
-        await self.db.execute(
-            update(Link)
-            .where(Link.short_code == short_code)
-            .values(clicks=Link.clicks + 1)
-        )
-        await self.db.commit()
+        await self._record_click(short_code, cached, details)
+        return cached.url
+
+    async def resolve_many(
+        self, short_codes: list[str], count_clicks: bool = False
+    ) -> dict[str, str | None]:
+        """
+        Get the original URLs of many short codes at once.
+        Checks the in-process cache, then Redis with one MGET, then the
+        database with one query for all remaining codes, and backfills
+        the caches in one pipeline. With a single query for all misses,
+        unknown codes are not worth filtering through the Bloom filter.
+        Records one click per distinct code found if count_clicks is set.
+
+        Returns a map of every requested code to its URL, or None if not found.
+        """
+        found: dict[str, CachedLink] = {}
+        misses = []
+        for short_code in dict.fromkeys(short_codes):
+            if not is_valid_short_code(short_code):
+                _lookup_invalid.inc()
+                continue
+            cached = link_cache.get(link_cache_key(short_code))
+            if cached is None:
+                misses.append(short_code)
+            else:
+                _lookup_local_hit.inc()
+                found[short_code] = cached
+
+        if misses:
+            # Read before Redis and the database, so links deleted meanwhile
+            # are not cached locally
+            generations = {
+                code: link_cache.generation(link_cache_key(code)) for code in misses
+            }
+            values = await self.redis.mget([link_cache_key(code) for code in misses])
+            misses_in_redis = []
+            for short_code, value in zip(misses, values):
+                if value == TOMBSTONE:
+                    # Recently deleted
+                    _lookup_rejected.inc()
+                    continue
+                cached = CachedLink.loads(value) if value else None
+                if cached is None:
+                    misses_in_redis.append(short_code)
+                else:
+                    _lookup_redis_hit.inc()
+                    link_cache.set(
+                        link_cache_key(short_code),
+                        cached,
+                        generation=generations[short_code],
+                    )
+                    found[short_code] = cached
+
+            if misses_in_redis:
+                found.update(await self._fetch_and_cache(misses_in_redis, generations))
+
+        for short_code in [code for code, cached in found.items() if cached.expired]:
+            _lookup_expired.inc()
+            del found[short_code]
+
+        if count_clicks and found:
+            await self._record_clicks(found)
+
+        return {
+            short_code: found[short_code].url if short_code in found else None
+            for short_code in short_codes
+        }
+
+    async def _fetch_and_cache(
+        self, short_codes: list[str], generations: dict[str, int]
+    ) -> dict[str, CachedLink]:
+        """
+        Load links from the database in one query and cache them.
+        Reads from the replica, then looks for codes it did not find on
+        the primary. Links are cached locally only if
+        their generation (read before the lookup) is unchanged.
+        """
+
+        def query(codes: list[str]):
+            return select(
+                Link.short_code, Link.original_url, Link.user_id, Link.expires_at
+            ).where(Link.short_code == any_(_short_codes_param(codes)), not_expired())
+
+        session_factory = read_sessionmaker()
+        async with session_factory() as db:
+            rows = (await db.execute(query(short_codes))).all()
+        if len(rows) < len(short_codes) and session_factory is not AsyncSessionLocal:
+            # Links may be too new to have reached the replica
+            found_codes = {row.short_code for row in rows}
+            missing = [code for code in short_codes if code not in found_codes]
+            async with AsyncSessionLocal() as db:
+                rows += (await db.execute(query(missing))).all()
+
+        _lookup_db_hit.inc(len(rows))
+        _lookup_db_miss.inc(len(short_codes) - len(rows))
+
+        found = {row.short_code: CachedLink.from_link(row) for row in rows}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for short_code, cached in found.items():
+                # NX: never overwrite a tombstone left by a delete meanwhile
+                pipe.set(
+                    link_cache_key(short_code),
+                    cached.dumps(),
+                    ex=cached.cache_ttl(),
+                    nx=True,
+                )
+            stored = await pipe.execute()
+        for (short_code, cached), was_stored in zip(found.items(), stored):
+            if was_stored:
+                link_cache.set(
+                    link_cache_key(short_code),
+                    cached,
+                    generation=generations[short_code],
+                )
+        return found
+
+    async def _record_click(
+        self, short_code: str, link: CachedLink, details: ClickDetails | None
+    ) -> None:
+        """Record a click on one link."""
+        await self._record_clicks({short_code: link}, details)
+
+    async def _record_clicks(
+        self, links: dict[str, CachedLink], details: ClickDetails | None = None
+    ) -> None:
+        """
+        Record one click on each link: counters, leaderboards and time
+        buckets are updated in one Redis pipeline, plus the database in
+        sync mode. With details, a click event is appended to the stream
+        and the visitor counted in the same pipeline.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for short_code, link in links.items():
+                if CLICK_COUNTER_MODE != "sync":
+                    queue_click(pipe, short_code)
+                queue_leaderboard_click(pipe, short_code, link.user_id)
+                queue_bucket_click(pipe, short_code)
+                if details is not None:
+                    if CLICK_EVENTS_ENABLED:
+                        queue_click_event(pipe, short_code, details)
+                    if details.visitor is not None:
+                        queue_visit(pipe, short_code, details.visitor)
+            await pipe.execute()
+
+        if CLICK_COUNTER_MODE == "sync":
+            await self._increment_clicks(list(links))
+
+    async def _increment_clicks(self, short_codes: list[str]) -> None:
+        """Increment click count for links."""
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                FLUSH_CLICKS_SQL,
+                {"codes": short_codes, "deltas": [1] * len(short_codes)},
+            )
+            await db.commit()
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from redis.asyncio import Redis
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from cache import register_reconnect_hook
+from database import read_sessionmaker
+from models import Link, LinkClickRollup, LinkCounter
+from redis_client import redis_pool
+from routes.redirect.service import CachedLink, link_cache, link_cache_key, not_expired
+from settings import (
+    CACHE_WARM_BACKGROUND,
+    CACHE_WARM_BUDGET,
+    CACHE_WARM_LINKS,
+    CACHE_WARM_RECENT_HOURS,
+    CACHE_WARM_SOURCE,
+)
+
+logger = logging.getLogger(__name__)
+
+WARM_BATCH_SIZE = 500  # links written per Redis pipeline
+
+
+def _hot_links_query(limit: int):
+    """Top links by lifetime clicks, or by clicks in the recent hourly rollups."""
+    columns = (Link.short_code, Link.original_url, Link.user_id, Link.expires_at)
+    if CACHE_WARM_SOURCE == "recent":
+        since = datetime.now(timezone.utc) - timedelta(hours=CACHE_WARM_RECENT_HOURS)
+        return (
+            select(*columns)
+            .join(LinkClickRollup, LinkClickRollup.link_id == Link.id)
+            .where(
+                LinkClickRollup.granularity == "hour",
+                LinkClickRollup.bucket_start >= since,
+                not_expired(),
+            )
+            .group_by(Link.id)
+            .order_by(func.sum(LinkClickRollup.clicks).desc())
+            .limit(limit)
+        )
+    return (
+        select(*columns)
+        .join(LinkCounter, LinkCounter.link_id == Link.id)
+        .where(not_expired())
+        .order_by(LinkCounter.clicks.desc())
+        .limit(limit)
+    )
+
+
+async def warm_link_cache(limit: int = CACHE_WARM_LINKS) -> int:
+    """
+    Preload the hottest links into Redis and this worker's local cache,
+    so they do not all miss at once after a deploy or a Redis restart.
+    Stops after CACHE_WARM_BUDGET seconds, keeping what was loaded.
+
+    Returns the number of links warmed.
+    """
+    if limit <= 0:
+        return 0
+
+    warmed = 0
+    try:
+        async with asyncio.timeout(CACHE_WARM_BUDGET):
+            # Links deleted during the query are kept out of the local cache
+            generation = link_cache.clock
+            async with read_sessionmaker()() as db:
+                rows = (await db.execute(_hot_links_query(limit))).all()
+
+            cached = [
+                (link_cache_key(row.short_code), CachedLink.from_link(row))
+                for row in rows
+            ]
+
+            async with Redis(connection_pool=redis_pool) as redis:
+                for start in range(0, len(cached), WARM_BATCH_SIZE):
+                    batch = cached[start : start + WARM_BATCH_SIZE]
+                    async with redis.pipeline(transaction=False) as pipe:
+                        for key, link in batch:
+                            # NX: keep tombstones of links deleted meanwhile
+                            pipe.set(key, link.dumps(), ex=link.cache_ttl(), nx=True)
+                        await pipe.execute()
+                    warmed += len(batch)
+
+            # Hottest links last, so the LRU evicts the coldest first
+            for key, link in reversed(cached):
+                link_cache.set(key, link, generation=generation)
+    except TimeoutError:
+        logger.warning(
+            "Cache warming stopped after %ss with %d links warmed",
+            CACHE_WARM_BUDGET,
+            warmed,
+        )
+        return warmed
+
+    logger.info("Warmed caches with %d links", warmed)
+    return warmed
+
+
+async def _warm_on_startup() -> None:
+    try:
+        await warm_link_cache()
+    except Exception:
+        # Serving works without warm caches, just slower at first
+        logger.exception("Cache warming failed")
+
+
+async def start_cache_warming() -> asyncio.Task | None:
+    """
+    Warm caches at startup, in the background unless CACHE_WARM_BACKGROUND
+    is off. Returns the background task, to cancel on shutdown.
+    """
+    if CACHE_WARM_BACKGROUND:
+        return asyncio.create_task(_warm_on_startup(), name="cache-warming")
+
+    await _warm_on_startup()
+    return None
+
+
+# A reconnect may mean Redis restarted empty
+register_reconnect_hook(warm_link_cache)
@@ -0,0 +1,21 @@
+from starlette.types import Scope
+
+from settings import CLIENT_IP_HEADER
+
+_CLIENT_IP_HEADER = CLIENT_IP_HEADER.encode("latin-1")
+
+
+def client_ip(scope: Scope) -> str:
+    """
+    The client's IP address: the first CLIENT_IP_HEADER value when that is
+    set and present, otherwise the connection's address.
+    """
+    if _CLIENT_IP_HEADER:
+        for name, value in scope["headers"]:
+            if name == _CLIENT_IP_HEADER:
+                forwarded = value.decode("latin-1").strip()
+                if forwarded:
+                    return forwarded
+                break
+    client = scope.get("client")
+    return client[0] if client else "unknown"
@@ -1,7 +1,10 @@
 from fastapi import FastAPI
 
+from routes.admin.routes import router as admin_router
+from routes.analytics.routes import router as analytics_router
 from routes.auth.routes import router as auth_router
 from routes.links.routes import router as links_router
+from routes.metrics.routes import router as metrics_router
 from routes.redirect.routes import router as redirect_router
 from routes.users.routes import router as users_router
 
@@ -11,4 +14,7 @@ def include_routers(app: FastAPI) -> None:
     app.include_router(auth_router)
     app.include_router(links_router)
     app.include_router(users_router)
+    app.include_router(admin_router)
+    app.include_router(analytics_router)
     app.include_router(redirect_router)
+    app.include_router(metrics_router)
@@ -1,13 +1,17 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from database import get_db
+from cache import invalidate
+from database import get_read_db, get_write_db
 from models import User
+from redis_client import get_redis
 from routes.auth.schemas import UserResponse, UserUpdate
-from routes.auth.service import get_current_user
+from routes.auth.service import get_current_user, principal_cache_key
+from routes.pagination import PageParams, page_items, paginate
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -24,19 +28,22 @@ async def require_admin(current_user: User = Depends(get_current_user)) -> User:
 
 @router.get("", response_model=list[UserResponse])
 async def list_users(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
     _: User = Depends(require_admin),
 ) -> list[User]:
-    """List all users. Requires admin access."""
-    result = await db.execute(select(User).order_by(User.created_at.desc()))
-    return result.scalars().all()
+    """List users, newest first. Requires admin access. Paginated like /links."""
+    result = await db.execute(paginate(select(User), User, page))
+    return page_items(result.scalars().all(), page, response)
 
 
 @router.patch("/{user_id}", response_model=UserResponse)
 async def update_user(
     user_id: UUID,
     user_update: UserUpdate,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
+    redis: Redis = Depends(get_redis),
     current_user: User = Depends(require_admin),
 ) -> User:
     """Update a user's status. Requires admin access."""
@@ -64,13 +71,17 @@ async def update_user(
 
     await db.commit()
     await db.refresh(user)
+
+    # Cached principals must not outlive a deactivation or role change
+    await invalidate(redis, principal_cache_key(user_id))
     return user
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
+    redis: Redis = Depends(get_redis),
     current_user: User = Depends(require_admin),
 ) -> None:
     """Delete a user. Requires admin access."""
@@ -92,3 +103,5 @@ async def delete_user(
 
     await db.delete(user)
     await db.commit()
+
+    await invalidate(redis, principal_cache_key(user_id))
@@ -14,17 +14,204 @@ DATABASE_URL = (
     f"@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 )
 
+# Connection pool per worker: at most DB_POOL_SIZE + DB_MAX_OVERFLOW
+# connections, so keep (workers x that) below Postgres max_connections
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+# Seconds to wait for a free connection before failing the request
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+# Replace connections older than this many seconds (-1 never)
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+# Test connections on checkout, at the cost of a round trip
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "false").lower() == "true"
+# Prepared statements SQLAlchemy caches per connection (0 disables)
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", "100"))
+
+# Optional read replica for read-only queries (same credentials and
+# database name; pool settings as above). Unset sends all reads to the
+# primary.
+POSTGRES_READ_HOST = os.environ.get("POSTGRES_READ_HOST", "")
+POSTGRES_READ_PORT = int(os.environ.get("POSTGRES_READ_PORT", str(POSTGRES_PORT)))
+DATABASE_READ_URL = (
+    f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}"
+    f"@{POSTGRES_READ_HOST}:{POSTGRES_READ_PORT}/{POSTGRES_DB}"
+    if POSTGRES_READ_HOST
+    else None
+)
+# Reads go back to the primary while the replica is unreachable or
+# more than DB_REPLICA_MAX_LAG seconds behind, checked this often
+DB_REPLICA_CHECK_INTERVAL = float(os.environ.get("DB_REPLICA_CHECK_INTERVAL", "5"))
+DB_REPLICA_MAX_LAG = float(os.environ.get("DB_REPLICA_MAX_LAG", "10"))
+
 # ===================
 # Redis Settings
 # ===================
 REDIS_URL = os.environ["REDIS_URL"]
 
+# ===================
+# Caching
+# ===================
+# In-process cache in front of Redis for short_code lookups (per worker)
+LINK_CACHE_SIZE = int(os.environ.get("LINK_CACHE_SIZE", "10000"))
+LINK_CACHE_TTL = float(os.environ.get("LINK_CACHE_TTL", "60"))
+# How long unknown short codes are remembered in Redis
+LINK_NEGATIVE_CACHE_TTL = int(os.environ.get("LINK_NEGATIVE_CACHE_TTL", "60"))
+# On a cache miss one worker loads the link while the others wait up to
+# LINK_FILL_WAIT seconds for it; its lock expires after LINK_FILL_LOCK_TTL
+LINK_FILL_LOCK_TTL = float(os.environ.get("LINK_FILL_LOCK_TTL", "2"))
+LINK_FILL_WAIT = float(os.environ.get("LINK_FILL_WAIT", "0.25"))
+# Bloom filter over existing short codes (2^24 bits = 2 MB, twice that with
+# the next bitmap being built; ~1% false positives at 1.7M links with 7 hashes)
+LINK_BLOOM_BITS = int(os.environ.get("LINK_BLOOM_BITS", str(2**24)))
+LINK_BLOOM_HASHES = int(os.environ.get("LINK_BLOOM_HASHES", "7"))
+# Hours between rebuilds that clear the bits of deleted and expired codes
+LINK_BLOOM_REBUILD_HOURS = float(os.environ.get("LINK_BLOOM_REBUILD_HOURS", "24"))
+# Links preloaded into Redis and the local cache at startup and after
+# Redis reconnects (0 disables), ranked by lifetime "clicks" or by
+# "recent" clicks over the last CACHE_WARM_RECENT_HOURS
+CACHE_WARM_LINKS = int(os.environ.get("CACHE_WARM_LINKS", "1000"))
+CACHE_WARM_SOURCE = os.environ.get("CACHE_WARM_SOURCE", "clicks")
+CACHE_WARM_RECENT_HOURS = int(os.environ.get("CACHE_WARM_RECENT_HOURS", "24"))
+# Seconds warming may take before it gives up on the remaining links
+CACHE_WARM_BUDGET = float(os.environ.get("CACHE_WARM_BUDGET", "10"))
+# Warm in the background instead of delaying startup until it finishes
+CACHE_WARM_BACKGROUND = (
+    os.environ.get("CACHE_WARM_BACKGROUND", "true").lower() == "true"
+)
+
+# ===================
+# Click Counting
+# ===================
+# "write_behind" buffers clicks in Redis and flushes them to Postgres in batches,
+# "sync" updates link_counters on every redirect
+CLICK_COUNTER_MODE = os.environ.get("CLICK_COUNTER_MODE", "write_behind")
+CLICK_FLUSH_INTERVAL = float(os.environ.get("CLICK_FLUSH_INTERVAL", "5"))
+CLICK_FLUSH_BATCH_SIZE = int(os.environ.get("CLICK_FLUSH_BATCH_SIZE", "1000"))
+# Keep per-day leaderboards next to the lifetime ones, for this many days
+LEADERBOARD_DAILY = os.environ.get("LEADERBOARD_DAILY", "true").lower() == "true"
+LEADERBOARD_DAY_RETENTION = int(os.environ.get("LEADERBOARD_DAY_RETENTION", "7"))
+
+# ===================
+# Click Events
+# ===================
+# Append each redirect's details to a Redis stream, loaded into the
+# click_events table by management/commands/ingest_clicks.py
+CLICK_EVENTS_ENABLED = os.environ.get("CLICK_EVENTS_ENABLED", "true").lower() == "true"
+# Approximate cap on events kept in the stream; the oldest are trimmed
+# first, even if not yet ingested
+CLICK_EVENTS_MAXLEN = int(os.environ.get("CLICK_EVENTS_MAXLEN", "1000000"))
+# Request header with the visitor's two-letter country code, set by a CDN
+CLICK_EVENTS_COUNTRY_HEADER = os.environ.get(
+    "CLICK_EVENTS_COUNTRY_HEADER", "cf-ipcountry"
+).lower()
+# Events loaded per COPY, and seconds the ingester waits for new events
+CLICK_INGEST_BATCH_SIZE = int(os.environ.get("CLICK_INGEST_BATCH_SIZE", "5000"))
+CLICK_INGEST_BLOCK = float(os.environ.get("CLICK_INGEST_BLOCK", "1"))
+
+# ===================
+# Rate Limiting
+# ===================
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Requests per minute and burst size allowed per client (user, or IP when
+# anonymous) for each group of routes; 0 requests per minute disables a group.
+# Anonymous clients are only limited when CLIENT_IP_HEADER is set.
+RATE_LIMIT_REDIRECT_PER_MINUTE = float(
+    os.environ.get("RATE_LIMIT_REDIRECT_PER_MINUTE", "600")
+)
+RATE_LIMIT_REDIRECT_BURST = int(os.environ.get("RATE_LIMIT_REDIRECT_BURST", "100"))
+RATE_LIMIT_LOGIN_PER_MINUTE = float(os.environ.get("RATE_LIMIT_LOGIN_PER_MINUTE", "10"))
+RATE_LIMIT_LOGIN_BURST = int(os.environ.get("RATE_LIMIT_LOGIN_BURST", "5"))
+RATE_LIMIT_CREATE_PER_MINUTE = float(
+    os.environ.get("RATE_LIMIT_CREATE_PER_MINUTE", "60")
+)
+RATE_LIMIT_CREATE_BURST = int(os.environ.get("RATE_LIMIT_CREATE_BURST", "20"))
+# Most tokens a worker takes from Redis at once (capped at a tenth of the
+# burst), and seconds it may spend them without asking Redis again
+RATE_LIMIT_LEASE = int(os.environ.get("RATE_LIMIT_LEASE", "10"))
+RATE_LIMIT_LEASE_TTL = float(os.environ.get("RATE_LIMIT_LEASE_TTL", "1"))
+
+# ===================
+# Link Expiry
+# ===================
+# Seconds between runs of the reaper deleting expired links, and links
+# deleted per transaction
+LINK_REAP_INTERVAL = float(os.environ.get("LINK_REAP_INTERVAL", "60"))
+LINK_REAP_BATCH_SIZE = int(os.environ.get("LINK_REAP_BATCH_SIZE", "500"))
+
 # ===================
 # JWT Authentication
 # ===================
 JWT_SECRET_KEY = os.environ["JWT_SECRET_KEY"]
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRE_DAYS = int(os.environ.get("JWT_EXPIRE_DAYS", "7"))
+# bcrypt cost; existing hashes are upgraded on their next login
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+# Pool that runs bcrypt off the event loop ("thread" or "process"), and how
+# many calls may queue for it before logins get 503 responses
+PASSWORD_HASH_EXECUTOR = os.environ.get("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.environ.get("PASSWORD_HASH_QUEUE", "16"))
+# Per-worker cache of decoded tokens and authenticated users
+PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = float(os.environ.get("PRINCIPAL_CACHE_TTL", "30"))
+
+# ===================
+# Short Codes
+# ===================
+# Key for the permutation that makes sequential codes unguessable.
+# Required and separate from JWT_SECRET_KEY, so rotating that key cannot
+# change the permutation; changing it makes new codes collide with old ones.
+SHORT_CODE_SECRET = os.environ["SHORT_CODE_SECRET"]
+
+# ===================
+# Click Analytics
+# ===================
+# Per-minute click buckets live in Redis until rolled up into Postgres
+CLICK_BUCKET_TTL = int(os.environ.get("CLICK_BUCKET_TTL", str(7 * 86400)))
+CLICK_ROLLUP_INTERVAL = float(os.environ.get("CLICK_ROLLUP_INTERVAL", "60"))
+# Days to keep rollups of each granularity (0 keeps them forever)
+CLICK_ROLLUP_RETENTION_DAYS = {
+    "minute": int(os.environ.get("CLICK_ROLLUP_RETENTION_MINUTE_DAYS", "2")),
+    "hour": int(os.environ.get("CLICK_ROLLUP_RETENTION_HOUR_DAYS", "90")),
+    "day": int(os.environ.get("CLICK_ROLLUP_RETENTION_DAY_DAYS", "0")),
+}
+# Count unique visitors (IP and user agent) per link in Redis HyperLogLogs,
+# for all time and per day; each takes at most 12 KB
+UNIQUE_VISITORS_ENABLED = (
+    os.environ.get("UNIQUE_VISITORS_ENABLED", "true").lower() == "true"
+)
+UNIQUE_VISITORS_DAY_RETENTION = int(
+    os.environ.get("UNIQUE_VISITORS_DAY_RETENTION", "30")
+)
+
+# ===================
+# Links
+# ===================
+LINKS_BULK_MAX_ITEMS = int(os.environ.get("LINKS_BULK_MAX_ITEMS", "10000"))
+
+# ===================
+# Pagination
+# ===================
+PAGE_SIZE_DEFAULT = int(os.environ.get("PAGE_SIZE_DEFAULT", "100"))
+PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", "1000"))
+
+# ===================
+# Metrics
+# ===================
+# How often each worker publishes its metrics to Redis for /metrics
+METRICS_PUBLISH_INTERVAL = float(os.environ.get("METRICS_PUBLISH_INTERVAL", "5"))
+# Bearer token required to scrape /metrics (empty leaves it open)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# ===================
+# Proxy
+# ===================
+# Header holding the client IP when behind a proxy such as Cloudflare
+# (CF-Connecting-IP), for rate limits and unique visitors; only set it if
+# the proxy always overwrites the header. Empty uses the connection's
+# address, and anonymous clients are not rate limited, since behind a
+# proxy they would all share one bucket
+CLIENT_IP_HEADER = os.environ.get("CLIENT_IP_HEADER", "").lower()
 
 # ===================
 # CORS Settings
@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import string
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models.link import short_code_block_seq
+from settings import SHORT_CODE_SECRET
+
+SHORT_CODE_ALPHABET = string.ascii_letters + string.digits
+SHORT_CODE_LENGTH = 9
+
+# Each value of short_code_block_seq leases this many consecutive indices.
+# Changing it would re-issue indices, so it is fixed rather than a setting.
+SHORT_CODE_BLOCK_SIZE = 100
+
+# Indices are permuted within 52 bits (2^52 < 62^9, so codes always fit
+# in SHORT_CODE_LENGTH characters)
+_HALF_BITS = 26
+_HALF_MASK = (1 << _HALF_BITS) - 1
+_FEISTEL_ROUNDS = 4
+_FEISTEL_KEY = hashlib.blake2b(SHORT_CODE_SECRET.encode(), digest_size=32).digest()
+
+
+def is_valid_short_code(short_code: str) -> bool:
+    """Check that a short code has the length and charset we generate."""
+    return (
+        len(short_code) == SHORT_CODE_LENGTH
+        and short_code.isascii()
+        and short_code.isalnum()
+    )
+
+
+def _feistel_round(value: int, round_index: int) -> int:
+    data = value.to_bytes(4, "little") + bytes([round_index])
+    digest = hashlib.blake2b(data, digest_size=4, key=_FEISTEL_KEY).digest()
+    return int.from_bytes(digest, "little") & _HALF_MASK
+
+
+def permute_index(index: int) -> int:
+    """
+    Map an index to a unique, unpredictable 52-bit number.
+    A keyed Feistel network is a bijection, so distinct indices
+    can never produce the same code.
+    """
+    left, right = index >> _HALF_BITS, index & _HALF_MASK
+    for round_index in range(_FEISTEL_ROUNDS):
+        left, right = right, left ^ _feistel_round(right, round_index)
+    return (left << _HALF_BITS) | right
+
+
+def encode_short_code(number: int) -> str:
+    """Encode a number as a fixed-length base62 short code."""
+    chars = []
+    for _ in range(SHORT_CODE_LENGTH):
+        number, remainder = divmod(number, len(SHORT_CODE_ALPHABET))
+        chars.append(SHORT_CODE_ALPHABET[remainder])
+    return "".join(reversed(chars))
+
+
+def short_code_for_index(index: int) -> str:
+    """Short code for a leased index."""
+    return encode_short_code(permute_index(index))
+
+
+class ShortCodeAllocator:
+    """
+    Allocates collision-free short codes.
+    Indices are leased in blocks from a Postgres sequence, so most
+    allocations need no database round trip.
+    """
+
+    def __init__(self):
+        self._blocks: list[range] = []
+        self._lock = asyncio.Lock()
+
+    async def allocate(self, db: AsyncSession, count: int = 1) -> list[str]:
+        """Allocate `count` new short codes."""
+        async with self._lock:
+            available = sum(len(block) for block in self._blocks)
+            if available < count:
+                await self._lease(db, count - available)
+
+            codes = []
+            while len(codes) < count:
+                block = self._blocks[0]
+                take = min(len(block), count - len(codes))
+                codes.extend(short_code_for_index(i) for i in block[:take])
+                if take == len(block):
+                    self._blocks.pop(0)
+                else:
+                    self._blocks[0] = block[take:]
+            return codes
+
+    async def _lease(self, db: AsyncSession, count: int) -> None:
+        """Lease enough blocks for at least `count` more codes."""
+        block_count = -(-count // SHORT_CODE_BLOCK_SIZE)
+        result = await db.scalars(
+            select(short_code_block_seq.next_value()).select_from(
+                func.generate_series(1, block_count)
+            )
+        )
+        for block in result:
+            start = block * SHORT_CODE_BLOCK_SIZE
+            self._blocks.append(range(start, start + SHORT_CODE_BLOCK_SIZE))
+
+
+short_code_allocator = ShortCodeAllocator()
@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import LoginForm from './LoginForm';
 import LinksTab from './LinksTab';
 import UsersTab from './UsersTab';
@@ -6,6 +6,29 @@ import type { Link, User, CurrentUser } from '../types';
 import { API_BASE_URL, FRONTEND_URL } from '../config';
 import './Dashboard.css';
 
+// Largest page the API serves (PAGE_SIZE_MAX)
+const PAGE_SIZE = 1000;
+// How long after a write lists are read from the primary database, so
+// they include it; covers DB_REPLICA_MAX_LAG plus a replica health check
+const READ_PRIMARY_MS = 15000;
+
+type PagedResult<T> = { ok: true; items: T[] } | { ok: false; status: number };
+
+// Fetch every page of a paginated list, following the X-Next-Cursor header
+async function fetchAllPages<T>(path: string, headers: HeadersInit): Promise<PagedResult<T>> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (cursor) params.set('cursor', cursor);
+    const response: Response = await fetch(`${API_BASE_URL}${path}?${params}`, { headers });
+    if (!response.ok) return { ok: false, status: response.status };
+    items.push(...((await response.json()) as T[]));
+    cursor = response.headers.get('X-Next-Cursor');
+  } while (cursor);
+  return { ok: true, items };
+}
+
 const Dashboard: React.FC = () => {
   const [token, setToken] = useState<string | null>(() => localStorage.getItem('token'));
   const [url, setUrl] = useState('');
@@ -17,6 +40,7 @@ const Dashboard: React.FC = () => {
   const [error, setError] = useState<string | null>(null);
   const [copiedCode, setCopiedCode] = useState<string | null>(null);
   const [activeTab, setActiveTab] = useState<'links' | 'users'>('links');
+  const readPrimaryUntil = useRef(0);
 
   const authHeaders = useCallback(
     () => ({
@@ -26,6 +50,19 @@ const Dashboard: React.FC = () => {
     [token]
   );
 
+  // Headers for list reads: ask for the primary shortly after our own writes,
+  // since a lagging read replica may not have them yet
+  const readHeaders = useCallback((): Record<string, string> => {
+    if (Date.now() < readPrimaryUntil.current) {
+      return { ...authHeaders(), 'X-Read-Primary': 'true' };
+    }
+    return authHeaders();
+  }, [authHeaders]);
+
+  const markWritten = () => {
+    readPrimaryUntil.current = Date.now() + READ_PRIMARY_MS;
+  };
+
   const handleLogout = () => {
     localStorage.removeItem('token');
     setToken(null);
@@ -56,35 +93,29 @@ const Dashboard: React.FC = () => {
     if (!token) return;
 
     try {
-      const response = await fetch(`${API_BASE_URL}/links`, {
-        headers: authHeaders(),
-      });
-      if (response.ok) {
-        const data = await response.json();
-        setLinks(data);
-      } else if (response.status === 401) {
+      const result = await fetchAllPages<Link>('/links', readHeaders());
+      if (result.ok) {
+        setLinks(result.items);
+      } else if (result.status === 401) {
         handleLogout();
       }
     } catch (err) {
       console.error('Error fetching links:', err);
     }
-  }, [token, authHeaders]);
+  }, [token, readHeaders]);
 
   const fetchUsers = useCallback(async () => {
     if (!token || !currentUser?.is_admin) return;
 
     try {
-      const response = await fetch(`${API_BASE_URL}/users`, {
-        headers: authHeaders(),
-      });
-      if (response.ok) {
-        const data = await response.json();
-        setUsers(data);
+      const result = await fetchAllPages<User>('/users', readHeaders());
+      if (result.ok) {
+        setUsers(result.items);
       }
     } catch (err) {
       console.error('Error fetching users:', err);
     }
-  }, [token, authHeaders, currentUser?.is_admin]);
+  }, [token, readHeaders, currentUser?.is_admin]);
 
   useEffect(() => {
     if (token) {
@@ -116,6 +147,7 @@ const Dashboard: React.FC = () => {
       if (response.ok) {
         const data = await response.json();
         setGeneratedLink(`${FRONTEND_URL}/${data.short_code}`);
+        markWritten();
         await fetchStats();
         setUrl('');
       } else if (response.status === 401) {
@@ -144,6 +176,7 @@ const Dashboard: React.FC = () => {
         body: JSON.stringify({ is_active: !currentStatus }),
       });
       if (response.ok) {
+        markWritten();
         await fetchUsers();
       }
     } catch (err) {
@@ -159,6 +192,7 @@ const Dashboard: React.FC = () => {
         body: JSON.stringify({ is_admin: !currentStatus }),
       });
       if (response.ok) {
+        markWritten();
         await fetchUsers();
       }
     } catch (err) {
@@ -175,6 +209,7 @@ const Dashboard: React.FC = () => {
         headers: authHeaders(),
       });
       if (response.ok) {
+        markWritten();
         await fetchUsers();
       }
     } catch (err) {
@@ -191,6 +226,7 @@ const Dashboard: React.FC = () => {
         headers: authHeaders(),
       });
       if (response.ok) {
+        markWritten();
         await fetchStats();
       }
     } catch (err) {